@@ -0,0 +1,278 @@
+import asyncio
+from collections import deque
+
+from sentenceBuffer import SentenceBuffer, takeReply, commandName
+from mda3Parser import MDA3Parser
+from sampleRingBuffer import SampleRingBuffer
+from sessionClock import SessionClock
+
+
+class AsyncCEIACWDDW_Driver:
+    """
+    asyncio version of CEIACWDDW_Driver.
+
+    One reader task owns the stream. $MDA3 sentences go to the data buffer and
+    to the sample queue behind the async iterator; everything up to the ">"
+    prompt is the reply to the pending command it echoes, else to the oldest
+    one (sentenceBuffer.takeReply). Several sensors and other links can run
+    in one event loop without a thread per device.
+
+        driver = AsyncCEIACWDDW_Driver()
+        await driver.setupEthernet()
+        await driver.logIn()
+        await driver.startContinuousOutput()
+        async for sample in driver:
+            ...
+    """
+
+    def __init__(self, ip='192.168.1.202', port=23, timeout=3, buffer_capacity=200000, queue_size=10000):
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+
+        self.rx = SentenceBuffer(size=4096)
+        self.parser = MDA3Parser(validate_checksum=True)
+        self.clock = SessionClock()
+        self.output_rate = None  # Last known COR setting in Hz
+        self.data_buffer = SampleRingBuffer(capacity=buffer_capacity)
+        self.queue_size = queue_size
+        self.sample_queue = None
+        self.dropped_samples = 0  # Samples dropped because nobody consumed the queue
+
+        self.pending = deque()  # (command name, future) of commands waiting for their prompt
+        self.reply_lines = []
+
+        self.pin = "050899"
+        self.prompt = ">"
+
+    async def setupEthernet(self):
+        """Opens the connection and starts the reader task."""
+        try:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.ip, self.port), self.timeout)
+        except asyncio.TimeoutError:
+            print(f"ERROR SetupEth: Connection to {self.ip}:{self.port} timed out.")
+            return False
+        except OSError as e:
+            print(f"ERROR SetupEth: {e}")
+            return False
+
+        self.rx.clear()
+        self.reply_lines = []
+        self.clock.reset()
+        self.sample_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.reader_task = asyncio.create_task(self.readLoop())
+        print(f"SetupEth: Connected to sensor at {self.ip}:{self.port}")
+        return True
+
+    async def closeEthernet(self):
+        """Stops the reader task and closes the connection."""
+        if self.reader_task:
+            self.reader_task.cancel()
+            try:
+                await self.reader_task
+            except asyncio.CancelledError:
+                pass
+            self.reader_task = None
+        if self.writer:
+            try:
+                self.writer.close()
+                await self.writer.wait_closed()
+                print(f"Connection to {self.ip}:{self.port} is closed.")
+            except OSError as e:
+                print(f"ERROR CloseEth: {e}")
+            finally:
+                self.reader = None
+                self.writer = None
+
+    async def readLoop(self):
+        try:
+            while True:
+                data = await self.reader.read(4096)
+                if not data:
+                    print("ERROR Listener: Connection closed by sensor")
+                    break
+                self.dispatchLines(self.rx.feed(data), self.clock.now())
+        except OSError as e:
+            print(f"ERROR Listener: {e}")
+        finally:
+            while self.pending:
+                _, future = self.pending.popleft()
+                if not future.done():
+                    future.set_result(None)
+            if self.sample_queue is not None:
+                self.putSample(None)  # Ends the async iterator
+
+    def dispatchLines(self, lines, timestamp):
+        """Routes sentences to the data path and everything else to the pending command."""
+        sentences = []
+        for line in lines:
+            if line.startswith("$MDA3"):
+                sentences.append(line)
+            elif line == SentenceBuffer.PROMPT:
+                reply = "\n".join(self.reply_lines)
+                self.reply_lines = []
+                # A command that timed out is cancelled but keeps its place so its late reply is discarded.
+                lost, future = takeReply(self.pending, reply)
+                for skipped in lost:
+                    if not skipped.done():
+                        skipped.set_result(None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+            else:
+                self.reply_lines.append(line)
+
+        if sentences:
+            period_ns = int(1e9 / self.output_rate) if self.output_rate else 0
+            samples = self.parser.parseBatch(sentences, timestamp, period_ns)
+            self.data_buffer.extend(samples)
+            for sample in samples:
+                self.putSample(sample)
+
+    def putSample(self, sample):
+        try:
+            self.sample_queue.put_nowait(sample)
+        except asyncio.QueueFull:
+            # Drop the oldest sample, a slow consumer must not stall the reader.
+            self.sample_queue.get_nowait()
+            self.sample_queue.put_nowait(sample)
+            self.dropped_samples += 1
+
+    async def samples(self):
+        """Async iterator over streamed samples. Ends when the connection closes."""
+        while True:
+            sample = await self.sample_queue.get()
+            if sample is None:
+                return
+            yield sample
+
+    def __aiter__(self):
+        return self.samples()
+
+    async def sendCommand(self, query, data=None):
+        if data == None:
+            command = query + "\r"
+        else:
+            command = f"{query} {data}\r"
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((commandName(command), future))
+        try:
+            self.writer.write(command.encode())
+            await self.writer.drain()
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            print(f"ERROR queryResponse: Timed out.")
+        except OSError as e:
+            print(f"ERROR queryResponse: {e}")
+        return None
+
+    async def logIn(self):
+        print(f"Logging in to sensor...")
+        response = await self.sendCommand(self.pin)
+
+        if response is not None:
+            print(f"Login succesful")
+            return True
+        else:
+            print(f"ERROR logIn: expected prompt not received.")
+            return False
+
+    def getBufferedData(self, last_n=None, last_seconds=None):
+        """Zero-copy view of the buffered samples, see CEIACWDDW_Driver.getBufferedData."""
+        if last_seconds is not None:
+            return self.data_buffer.lastSeconds(last_seconds)
+        return self.data_buffer.last(last_n)
+
+    """---------------------------   Commands   ---------------------------"""
+    async def sendEndOfProgrammingMode(self):
+        return await self.sendCommand("PE")
+
+    async def readParameterList(self):
+        return await self.sendCommand("PT")
+
+    async def sendResetCommand(self):
+        return await self.sendCommand("RE")
+
+    async def readSerialNumber(self):
+        return await self.sendCommand("SN")
+
+    async def sensitivity(self, data = None):
+        return await self.sendCommand("SE", data)
+
+    async def readStatus(self):
+        return await self.sendCommand("STA")
+
+    async def readWorkingTime(self):
+        return await self.sendCommand("WT")
+
+    async def readProgramVersion(self):
+        return await self.sendCommand("PV")
+
+    async def ipAddress(self, data = None):
+        return await self.sendCommand("IPA", data)
+
+    async def gatewayAddress(self, data = None):
+        return await self.sendCommand("GW", data)
+
+    async def subnetMask(self, data = None):
+        return await self.sendCommand("MASK", data)
+
+    async def serverPort(self, data = None):
+        return await self.sendCommand("SPT", data)
+
+    async def selfCheck(self):
+        return await self.sendCommand("SC")
+
+    async def waterType(self, water_type = None):
+        if water_type == 1:
+            return await self.sendCommand("WTY FS")
+        elif water_type == 2:
+            return await self.sendCommand("WTY SW")
+        return await self.sendCommand("WTY")
+
+    async def startContinuousOutput(self):
+        return await self.sendCommand("CO ON")
+
+    async def stopContinuousOutput(self):
+        return await self.sendCommand("CO OFF")
+
+    async def outputRate(self, data = None):
+        response = await self.sendCommand("COR", data)
+        if response is not None:
+            try:
+                self.output_rate = float(data if data is not None else response.split()[-1])
+            except (ValueError, IndexError):
+                pass
+        return response
+
+    """-------------------------   Commands end   -------------------------"""
+
+
+if __name__ == "__main__":
+
+    async def main():
+        metalDetectorDriver = AsyncCEIACWDDW_Driver()
+        if not await metalDetectorDriver.setupEthernet():
+            print("Failed to establish connection.")
+            return
+        if not await metalDetectorDriver.logIn():
+            print("Failed to log in.")
+            await metalDetectorDriver.closeEthernet()
+            return
+
+        await metalDetectorDriver.startContinuousOutput()
+        try:
+            async for sample in metalDetectorDriver:
+                print(sample)
+        finally:
+            await metalDetectorDriver.stopContinuousOutput()
+            await metalDetectorDriver.closeEthernet()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
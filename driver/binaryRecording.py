@@ -0,0 +1,172 @@
+"""
+Append-only binary recording format for $MDA3 samples.
+
+    header   32 bytes   magic "CEIAMDA3", version, record size, flags, creation time (ns)
+    records  32 bytes each, little endian, see RECORD_DTYPE
+
+Records have fixed width so a file can be memory mapped straight into a
+NumPy structured array. A torn last record (e.g. after power loss) is
+ignored by the reader.
+"""
+import csv
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+from recordingWriter import CSV_HEADER
+from sessionClock import isoTimestamp, parseIsoTimestamp
+
+
+BINARY_EXTENSION = ".mda3"
+MAGIC = b"CEIAMDA3"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIq8x")
+
+RECORD_DTYPE = np.dtype([
+    ("Timestamp", "<i8"),  # ns since the epoch
+    ("RH1", "<i4"),
+    ("RH1R", "<i4"),
+    ("RL1", "<i4"),
+    ("RL1R", "<i4"),
+    ("DIS", "<i4"),
+    ("TYPE", "u1"),
+    ("DIM", "u1"),
+    ("FLAGS", "u1"),
+    ("CHECKSUM", "u1"),
+])
+
+# Record flags
+FLAG_MARKER = 1  # Not a sample, e.g. a gap marker
+
+TYPE_CODES = {"N": 0, "F": 1, "NN": 2, "NF": 3, "FN": 4, "FF": 5}
+DIM_CODES = {"N": 0, "S": 1, "M": 2, "L": 3}
+TYPE_NAMES = np.array(sorted(TYPE_CODES, key=TYPE_CODES.get))
+DIM_NAMES = np.array(sorted(DIM_CODES, key=DIM_CODES.get))
+
+
+def samplesToRecords(samples):
+    """Converts MDA3Sample records to a RECORD_DTYPE array."""
+    return np.array([
+        (sample.Timestamp, sample.RH1, sample.RH1R, sample.RL1, sample.RL1R, sample.DIS,
+         TYPE_CODES.get(sample.TYPE, 0), DIM_CODES.get(sample.DIM, 0), 0, int(sample.CHECKSUM or "0", 16))
+        for sample in samples
+    ], dtype=RECORD_DTYPE)
+
+
+class BinarySink:
+    """Writes samples in the binary recording format. Same interface as CsvSink."""
+
+    def __init__(self, filename, file=None):
+        self.filename = filename
+        self.file = file if file is not None else open(filename, mode='wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize, 0, time.time_ns()))
+        self.file.flush()
+
+    def write(self, samples):
+        self.file.write(samplesToRecords(samples).tobytes())
+
+    def writeMarker(self, marker):
+        # Marker record: FLAGS has FLAG_MARKER set and RH1 holds the number of samples lost.
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["Timestamp"] = marker.Timestamp
+        record["RH1"] = marker.lost
+        record["FLAGS"] = FLAG_MARKER
+        self.file.write(record.tobytes())
+
+    def writeRecords(self, records):
+        self.file.write(np.ascontiguousarray(records, dtype=RECORD_DTYPE).tobytes())
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def readHeader(filename):
+    with open(filename, "rb") as file:
+        raw = file.read(HEADER.size)
+    if len(raw) < HEADER.size:
+        raise ValueError(f"{filename}: file too short for a recording header")
+    magic, version, record_size, flags, created_ns = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise ValueError(f"{filename}: not a binary MDA3 recording")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{filename}: unsupported recording version {version} (record size {record_size})")
+    return {"version": version, "record_size": record_size, "flags": flags, "created_ns": created_ns}
+
+
+def openBinaryRecording(filename):
+    """Memory maps a binary recording and returns its records as a read-only structured array."""
+    readHeader(filename)
+    n_records = (os.path.getsize(filename) - HEADER.size) // RECORD_DTYPE.itemsize
+    if n_records <= 0:
+        return np.zeros(0, dtype=RECORD_DTYPE)
+    return np.memmap(filename, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(n_records,))
+
+
+def rowToRecord(row):
+    """Converts one CSV row to a RECORD_DTYPE tuple. Raises ValueError, KeyError or IndexError for other rows."""
+    return (
+        parseIsoTimestamp(row[0]), int(row[1]), int(row[2]), int(row[3]), int(row[4]),
+        int(row[6]), TYPE_CODES[row[5]], DIM_CODES[row[7]], 0, int(row[8] or "0", 16),
+    )
+
+
+def csvToBinary(csv_filename, binary_filename):
+    """Converts a driver (or test harness) CSV recording. Annotation rows such as THRUSTER changes are skipped."""
+    rows = []
+    skipped = 0
+    with open(csv_filename, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            try:
+                rows.append(rowToRecord(row))
+            except (ValueError, KeyError, IndexError):
+                skipped += 1
+
+    sink = BinarySink(binary_filename)
+    sink.writeRecords(np.array(rows, dtype=RECORD_DTYPE))
+    sink.close()
+    return len(rows), skipped
+
+
+def binaryToCsv(binary_filename, csv_filename, header=CSV_HEADER):
+    """Converts a binary recording back to the driver CSV layout."""
+    return recordsToCsv(openBinaryRecording(binary_filename), csv_filename, header)
+
+
+def recordsToCsv(records, csv_filename, header=CSV_HEADER):
+    """Writes RECORD_DTYPE records in the driver CSV layout, without marker records."""
+    records = records[(records["FLAGS"] & FLAG_MARKER) == 0]
+    types = TYPE_NAMES[records["TYPE"]]
+    dims = DIM_NAMES[records["DIM"]]
+    with open(csv_filename, mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        for i, record in enumerate(records.tolist()):
+            writer.writerow([
+                isoTimestamp(record[0]),
+                record[1], record[2], record[3], record[4], types[i], record[5], dims[i], f"{record[9]:02X}",
+            ])
+    return len(records)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(f"Usage: python {os.path.basename(__file__)} <input.csv|input{BINARY_EXTENSION}> <output>")
+        sys.exit(1)
+
+    source, target = sys.argv[1], sys.argv[2]
+    if source.endswith(BINARY_EXTENSION):
+        print(f"{binaryToCsv(source, target)} samples written to {target}")
+    else:
+        written, skipped = csvToBinary(source, target)
+        print(f"{written} samples written to {target}, {skipped} rows skipped")
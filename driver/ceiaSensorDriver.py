@@ -1,12 +1,43 @@
 import socket
 import time
 import threading
-import re
-import csv
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from collections import deque
-from datetime import datetime
+from collections import deque, namedtuple
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeoutError
+
+from sentenceBuffer import SentenceBuffer, takeReply, commandName
+from mda3Parser import MDA3Parser
+from sampleRingBuffer import SampleRingBuffer
+from sessionClock import SessionClock
+from recordingWriter import RecordingWriter, CsvSink, Marker, CSV_HEADER, FSYNC_CLOSE
+from binaryRecording import BinarySink, BINARY_EXTENSION, samplesToRecords
+from rotatingRecording import RotatingSink
+from journalRecording import JournalSink, JOURNAL_EXTENSION
+from sampleSubscribers import Subscription, POLICY_BLOCK, POLICY_DROP_OLDEST
+from spikeDetector import SpikeDetector
+from runningStats import ChannelStats
+from sharedSampleRing import SharedSampleRing
+from samplePublisher import SamplePublisher
+from sensorProfiles import PROFILES, profileCommands, checkReply
+from replaySource import ReplayEngine, estimateRate
+
+
+# STA status bits
+STATUS_ALARM = 1      # Signal above the alarm threshold
+STATUS_SETTLING = 4   # Balancing after power up or RE, readings not usable yet
+STATUS_FAULT = 64     # Critical error
+
+SensorStatus = namedtuple("SensorStatus", ["code", "alarm", "settling", "fault", "ready", "elapsed"])
+
+
+def decodeStatus(response, elapsed=0.0):
+    """Decodes an STA reply such as "STA 4" into a SensorStatus, None if it is not one."""
+    try:
+        code = int(response.split()[-1])
+    except (AttributeError, ValueError, IndexError):
+        return None
+    settling = bool(code & STATUS_SETTLING)
+    fault = bool(code & STATUS_FAULT)
+    return SensorStatus(code, bool(code & STATUS_ALARM), settling, fault, not settling and not fault, elapsed)
 
 
 
@@ -15,7 +46,7 @@ from datetime import datetime
 class CEIACWDDW_Driver:
 
     
-    def __init__(self, ip='192.168.1.202', port=23, gateway=None, netmask=None, timeout=3):
+    def __init__(self, ip='192.168.1.202', port=23, gateway=None, netmask=None, timeout=3, buffer_capacity=200000, stats_windows=(1, 10)):
         self.ip = ip
         self.port = port
         self.gateway = gateway
@@ -24,33 +55,77 @@ class CEIACWDDW_Driver:
         self.sock = None
 
         self.running = False
-        self.data_buffer = []
+        self.data_buffer = SampleRingBuffer(capacity=buffer_capacity)  # Fixed size, oldest samples are overwritten
         self.listener_thread = None
-        self.animation = None
+        self.rx = SentenceBuffer(size=4096)
+        self.parser = MDA3Parser(validate_checksum=True)
+        self.clock = SessionClock()  # Timestamps are int ns, taken once per received chunk
+        self.output_rate = None  # Last known COR setting in Hz, used to spread timestamps within a chunk
+        self.replaying = False  # Samples come from a recording, statistics windows follow their timestamps
+
+        # Commands waiting for their prompt, oldest first
+        self.pending = deque()
+        self.pending_lock = threading.Lock()
+        self.reply_lines = []
+
+        # Health counters, see stats()
+        self.timeouts = 0
+        self.command_timeouts = 0
+        self.gaps = 0
+        self.missing_samples = 0
+        self.last_sample_time = None  # Anchor of the gap balance, None restarts it (COR, CO, reconnect)
+        self.gap_received = 0  # Sentences received since the anchor
+        self.gap_deficit = None  # Unconfirmed shortfall in samples after the last chunk
+        self.listener_error = None
+
+        # Consumers of parsed samples, each on its own thread, see subscribe()
+        self.subscribers = []
+        self.subscribers_lock = threading.Lock()
+        self.listener_subscription = None  # The callback passed to startDataListener
+        self.shared_feed = None  # SharedSampleRing for other processes, see startSharedFeed()
+        self.publisher = None  # SamplePublisher for local network consumers, see startPublisher()
+
+        # Streaming spike detection on RH1/RL1, see startSpikeDetection()
+        self.spike_detector = None
+
+        # Session and sliding window statistics of RH1/RL1, windows in seconds
+        self.channel_stats = ChannelStats(channels=("RH1", "RL1"), windows=stats_windows)
+
+        # Supervised mode: last applied SE/COR/WTY/CO state, restored after a reconnect
+        self.settings = {}
+        self.continuous_output = False
+        self.reconnect = False
+        self.reconnect_delay = 0.5  # Initial backoff in s, doubled per failed attempt
+        self.reconnect_max_delay = 10.0
+        self.reconnect_after_timeouts = 3  # Silent timeouts in a row while streaming that count as a lost link
+        self.outages = []
+        self.profile_time = None  # Duration of the last applyProfile in s
 
         self.pin = "050899"
         self.prompt = ">"
 
         # Save data
         self.recording = False
-        self.record_file = None
-        self.record_writer = None
+        self.recorder = None  # RecordingWriter, writes on its own thread
 
 
-        # Live plot init
-        self.plot_buffer_size = 100  # Show the last 100 points
-        self.rh1_buffer = deque(maxlen=self.plot_buffer_size)
-        self.rl1_buffer = deque(maxlen=self.plot_buffer_size)
-        self.time_buffer = deque(maxlen=self.plot_buffer_size)  # Optional timestamp buffer
+        # Live plot, reads snapshots of data_buffer
+        self.live_plot = None
         self.plotting = False
 
     
-    def setupEthernet(self):
-        """Opens Ethernet socket."""
+    def setupEthernet(self, new_session=True):
+        """Opens Ethernet socket. A reconnect passes new_session=False to keep the session clock."""
         try:
             self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.sock.settimeout(self.timeout)
+            # Commands are tiny writes, don't let Nagle hold them back waiting for an ACK.
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             self.sock.connect((self.ip, self.port))
+            self.rx.clear()
+            self.reply_lines = []
+            if new_session:
+                self.clock.reset()
             print(f"SetupEth: Connected to sensor at {self.ip}:{self.port}")
             return True
         except socket.timeout:
@@ -72,35 +147,163 @@ class CEIACWDDW_Driver:
                 self.sock = None    
 
     def sendCommand(self, query, data=None):
-        
-        if data == None:
-            command = query + "\r"
-        else:
-            command = f"{query} {data}\r"
-
-        
-        self.sock.sendall(command.encode())
+        """
+        Sends a command and returns the reply text before the ">" prompt.
+        While the data listener runs it is the only socket reader and hands the
+        reply over through a future, so commands work during continuous output.
+        """
+        return self.sendCommands([(query, data)])[0]
+
+    def sendCommands(self, commands):
+        """
+        Sends a list of (query, data) commands in one write without waiting in
+        between and returns their replies in order, None for each that failed.
+        Replies are matched to commands by their prompts, oldest first, or by
+        the command name they echo (see sentenceBuffer.takeReply).
+        """
+        if not self.sock:
+            print(f"ERROR queryResponse: Not connected.")
+            return [None] * len(commands)
 
-        buffer_size = 50
+        payload = "".join(query + "\r" if data == None else f"{query} {data}\r" for query, data in commands)
+        replies = [Future() for _ in commands]
+        with self.pending_lock:
+            self.pending.extend((commandName(query), reply) for (query, _), reply in zip(commands, replies))
 
+        pumped = False
         try:
-        # Receiving streamed data from the socket
-            response = self.sock.recv(buffer_size).decode()
-            if response == ">":
-                response = None
-            elif ">" in response:
-                response = response.split(">")[0]
-                print(f"{response}")
-
-            response = response.strip()
-            
-            return response
-
+            self.sock.sendall(payload.encode())
+            if not self.running or threading.current_thread() is self.listener_thread:
+                # Nobody else reads the socket, pump it from here.
+                pumped = True
+                self.pumpUntil(replies[-1])
         except socket.timeout:
-            print(f"ERROR queryResponse: Timed out.")
+            pass
         except socket.error as e:
+            for reply in replies:
+                reply.cancel()
             print(f"ERROR queryResponse: {e}")
-        return None
+            return [None] * len(commands)
+
+        results = []
+        # Once pumping ran out nobody reads the socket any more, so there is nothing left to wait for.
+        deadline = time.monotonic() + (0 if pumped else self.timeout)
+        for (query, _), reply in zip(commands, replies):
+            try:
+                result = reply.result(timeout=max(0.0, deadline - time.monotonic()))
+            except (FutureTimeoutError, CancelledError):
+                # Stays queued cancelled, a late reply is discarded and a later command's reply drops it.
+                reply.cancel()
+                self.command_timeouts += 1
+                print(f"ERROR queryResponse: {query} timed out.")
+                result = None
+            else:
+                if result is None:
+                    self.command_timeouts += 1
+                    print(f"ERROR queryResponse: {query} reply lost.")
+            results.append(result)
+        return results
+
+    def applyProfile(self, profile):
+        """
+        Applies a configuration profile, by name from PROFILES or as a dict with
+        sensitivity, output_rate, water_type, ip_address, gateway, netmask and
+        server_port, in one pipelined batch. Every reply is checked against the
+        value set. Returns True if all settings were acknowledged.
+        """
+        name = profile if isinstance(profile, str) else "custom"
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                print(f"ERROR applyProfile: unknown profile {profile}")
+                return False
+            profile = PROFILES[profile]
+
+        commands = profileCommands(profile)
+        start = time.perf_counter()
+        replies = self.sendCommands(commands)
+        self.profile_time = time.perf_counter() - start
+
+        ok = True
+        for (query, data), reply in zip(commands, replies):
+            if not checkReply(query, data, reply):
+                print(f"ERROR applyProfile: {query} {data} answered {reply!r}")
+                ok = False
+                continue
+            if query in ("SE", "COR", "WTY"):
+                self.settings[query] = data
+            if query == "COR":
+                self.output_rate = float(data)
+                self.last_sample_time = None
+        print(f"Profile {name} applied in {self.profile_time * 1000:.1f} ms ({len(commands)} commands)")
+        return ok
+
+    def pumpUntil(self, reply):
+        """Reads the socket on the calling thread until the reply is in or the timeout expires."""
+        deadline = time.monotonic() + self.timeout
+        while not reply.done() and time.monotonic() < deadline:
+            self.dispatchLines(self.rx.readLines(self.sock), self.clock.now())
+
+    def dispatchLines(self, lines, timestamp):
+        """
+        Routes received lines: $MDA3 sentences to the data path, everything else
+        to the reply of the oldest pending command, completed by the prompt.
+        Returns the sentences and the samples parsed from them.
+        """
+        sentences = []
+        for line in lines:
+            if line.startswith("$MDA3"):
+                sentences.append(line)
+            elif line == SentenceBuffer.PROMPT:
+                reply_text = "\n".join(self.reply_lines)
+                self.reply_lines = []
+                with self.pending_lock:
+                    lost, reply = takeReply(self.pending, reply_text)
+                for future in lost:
+                    if future.set_running_or_notify_cancel():
+                        future.set_result(None)
+                if reply is not None and reply.set_running_or_notify_cancel():
+                    reply.set_result(reply_text)
+            else:
+                self.reply_lines.append(line)
+
+        samples = []
+        if sentences:
+            # Parse the whole chunk at once and add it to the data buffer.
+            samples = self.parser.parseBatch(sentences, timestamp, self.samplePeriod())
+            self.checkGap(len(sentences), timestamp)
+            self.storeSamples(samples)
+        return sentences, samples
+
+    def checkGap(self, n_sentences, timestamp):
+        """
+        Infers lost samples from the expected COR rate, as the balance of
+        periods elapsed against sentences received since an anchor chunk.
+        A shortfall is only counted once a following chunk brings no surplus,
+        so samples that arrive late in a burst after a stall pay it back.
+        """
+        period = self.samplePeriod()
+        if not period:
+            return
+        if self.last_sample_time is None:
+            self.last_sample_time, self.gap_received, self.gap_deficit = timestamp, 0, None
+            return
+        self.gap_received += n_sentences
+        deficit = (timestamp - self.last_sample_time) / period - self.gap_received
+        if deficit < 1.5:
+            # In balance, up to jitter: move the anchor along so clock drift does not add up.
+            self.last_sample_time, self.gap_received, self.gap_deficit = timestamp, 0, None
+        elif self.gap_deficit is not None and deficit >= self.gap_deficit - 0.5:
+            self.gaps += 1
+            self.missing_samples += round(deficit)
+            self.last_sample_time, self.gap_received, self.gap_deficit = timestamp, 0, None
+        else:
+            self.gap_deficit = deficit
+
+    def samplePeriod(self):
+        """Output period in ns from the last known COR rate, 0 if unknown."""
+        if not self.output_rate:
+            return 0
+        return int(1e9 / self.output_rate)
     
     def logIn(self):
         print(f"Logging in to sensor...")
@@ -114,152 +317,403 @@ class CEIACWDDW_Driver:
 
 
 
-    def parseSensorData(self, data_line, plot=True):
-        
-        pattern = r"\$MDA3,(\d+),(\d+),(\d+),(\d+),([NF]{1,2}),(\d+),([NSML])\*(\w+)"
-        match = re.match(pattern, data_line)
-
-        if not match:
-            return None
-        
-        rh1, rh1r, rl1, rl1r, dtype, dis, dim, checksum = match.groups()
-
-        parsed_data = {
-            "Timestamp": datetime.now().isoformat(),
-            "RH1": int(rh1),
-            "RH1R": int(rh1r),
-            "RL1": int(rl1),
-            "RL1R": int(rl1r),
-            "TYPE": dtype,
-            "DIS": int(dis),
-            "DIM": dim,
-            "CHECKSUM": checksum
-        }
-
-        if plot:
-            self.rh1_buffer.append(parsed_data["RH1"])
-            self.rl1_buffer.append(parsed_data["RL1"])
-            self.time_buffer.append(datetime.now())
-
-        if self.recording and self.record_writer:
-            self.record_writer.writerow([
-                parsed_data["Timestamp"],
-                parsed_data["RH1"],
-                parsed_data["RH1R"],
-                parsed_data["RL1"],
-                parsed_data["RL1R"],
-                parsed_data["TYPE"],
-                parsed_data["DIS"],
-                parsed_data["DIM"],
-                parsed_data["CHECKSUM"]
-            ])
-
+    def parseSensorData(self, data_line):
         
+        sample = self.parser.parse(data_line, self.clock.now())
+        if sample is not None:
+            self.storeSamples((sample,))
+        return sample
+
+    def storeSamples(self, samples):
+        """Adds parsed samples to the data buffer and the recording."""
+        self.data_buffer.extend(samples)
+        self.channel_stats.update(samples)
+
+        if self.recording and self.recorder:
+            if self.recorder.error is None:
+                self.recorder.submit(samples)
+            else:
+                self.recording = False
+
+        if self.spike_detector:
+            self.spike_detector.update(samples)
+
+        if self.shared_feed or self.publisher:
+            records = samplesToRecords(samples)
+            if self.shared_feed:
+                self.shared_feed.publishRecords(records)
+            if self.publisher:
+                self.publisher.publishRecords(records)
+
+        for subscription in self.subscribers:
+            subscription.publish(samples)
+
+    def startSharedFeed(self, name="ceia_samples", capacity=65536):
+        """
+        Publishes every parsed sample into a shared memory ring that other local
+        processes can follow with sharedSampleRing.SharedSampleReader(name).
+        """
+        try:
+            self.shared_feed = SharedSampleRing(name=name, capacity=capacity)
+            print(f"Shared feed started: {name}")
+        except Exception as e:
+            print(f"ERROR startSharedFeed: {e}")
+        return self.shared_feed
 
-        return parsed_data
-
-    def startDataListener(self, callback=None):
-        
+    def stopSharedFeed(self):
+        """Removes the shared memory ring. Stop the data listener first."""
+        if self.shared_feed:
+            feed, self.shared_feed = self.shared_feed, None
+            try:
+                feed.close()
+            except Exception as e:
+                print(f"ERROR stopSharedFeed: {e}")
+
+    def startPublisher(self, port=5023, udp_port=None, retention_seconds=60, host="127.0.0.1"):
+        """
+        Re-publishes every parsed sample as binary frames on a local TCP port
+        (and UDP port if given), keeping retention_seconds for consumers that
+        subscribe from an earlier time. See samplePublisher.SampleFeedClient.
+        """
+        try:
+            self.publisher = SamplePublisher(host=host, port=port, udp_port=udp_port, retention_seconds=retention_seconds).start()
+            udp = f", UDP {self.publisher.udp_port}" if udp_port is not None else ""
+            print(f"Publisher started: TCP {host}:{self.publisher.port}{udp}")
+        except Exception as e:
+            print(f"ERROR startPublisher: {e}")
+            self.publisher = None
+        return self.publisher
+
+    def stopPublisher(self):
+        if self.publisher:
+            publisher, self.publisher = self.publisher, None
+            publisher.stop()
+
+    def startSpikeDetection(self, prominence=150, channels=("RH1", "RL1"), callback=None):
+        """
+        Detects spikes of at least prominence mV on the given channels as samples
+        arrive. Events are kept in self.spike_detector.events and passed to
+        callback(event) on the acquisition thread, so the callback must be quick.
+        """
+        self.spike_detector = SpikeDetector(channels=channels, prominence=prominence, callback=callback)
+        return self.spike_detector
+
+    def stopSpikeDetection(self):
+        self.spike_detector = None
+
+    def getChannelStats(self, channel=None):
+        """
+        Returns count, mean, variance, min and max of RH1 and RL1 for the whole
+        session and each sliding window, e.g. getChannelStats("RH1")["10s"]["mean"].
+        Live, the windows end now, so they empty when samples stop arriving.
+        """
+        return self.channel_stats.query(channel, None if self.replaying else self.clock.now())
+
+    def getSpikeEvents(self):
+        """Returns the most recent SpikeEvents, oldest first."""
+        return list(self.spike_detector.events) if self.spike_detector else []
+
+    def subscribe(self, callback, queue_size=1000, policy=POLICY_DROP_OLDEST, batch=False, max_batch=1000, name=None):
+        """
+        Delivers every parsed sample to callback on its own thread through a
+        bounded queue. policy decides what happens when the queue is full:
+        "block" stalls the reader, "drop_oldest" or "drop_newest" discard
+        samples. With batch the callback receives lists of samples.
+        Returns the Subscription, whose stats() include the lag.
+        """
+        subscription = Subscription(callback, queue_size=queue_size, policy=policy, batch=batch, max_batch=max_batch, name=name)
+        with self.subscribers_lock:
+            # Replace the list so the reader can iterate it without the lock.
+            self.subscribers = self.subscribers + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription, drain=True):
+        with self.subscribers_lock:
+            self.subscribers = [s for s in self.subscribers if s is not subscription]
+        subscription.close(drain=drain)
+
+    def startDataListener(self, callback=None, stats_interval=None, reconnect=False):
+        """
+        Reads the socket on a background thread. callback(sample) is called with
+        every parsed MDA3Sample from its own subscriber thread, with the block
+        policy so no sample is skipped. With stats_interval (seconds)
+        a one line summary of stats() is printed periodically. With reconnect
+        the listener is supervised: a lost connection is reopened with backoff,
+        logged in again and the last SE/COR/WTY/CO state is reapplied.
+        """
         if not self.sock:
             print("ERROR startListener")
             return
         self.running = True
+        self.replaying = False
+        self.listener_error = None
+        self.reconnect = reconnect
+        if callback:
+            self.listener_subscription = self.subscribe(callback, queue_size=10000, policy=POLICY_BLOCK, name="listener")
         
         def listen():
+            next_stats = time.monotonic() + stats_interval if stats_interval else None
+            silent_timeouts = 0
             while self.running:
                 try:
-                    
-                    #Recieve data
-                    data = self.sock.recv(200).decode()
-                    if data:
-                        #Split data in lines if needed
-                        lines = data.split("\r")
-                        
-                        for line in lines:
-                            # Ignore command returns
-                            if not line.startswith("$MDA3"):
-                                continue
-                            if line.strip():
-                                # Parse data and add to the data buffer.
-                                self.data_buffer.append(self.parseSensorData(line))
-                                if callback:
-                                    callback(line.strip())
+                    # Recieve data, partial sentences are kept in self.rx until completed
+                    lines = self.rx.readLines(self.sock)
+                    # Command replies go to the waiting sendCommand, sentences to the data buffer.
+                    self.dispatchLines(lines, self.clock.now())
+                    silent_timeouts = 0
                 except socket.timeout:
-                    pass
+                    self.timeouts += 1
+                    silent_timeouts += 1
+                    if self.reconnect and self.continuous_output and silent_timeouts >= self.reconnect_after_timeouts:
+                        print(f"ERROR Listener: no data for {silent_timeouts} timeouts")
+                        self.listener_error = "stalled"
+                        silent_timeouts = 0
+                        self.recover()
                 except Exception as e:
                     print(f"ERROR Listener: {e}")        
-                    self.running = False
+                    self.listener_error = repr(e)
+                    if self.reconnect:
+                        self.recover()
+                    else:
+                        self.running = False
+                if next_stats is not None and time.monotonic() >= next_stats:
+                    self.printStats()
+                    next_stats += stats_interval
         self.listener_thread = threading.Thread(target=listen, daemon = True)
         self.listener_thread.start()
 
+    def startReplay(self, path, speed=1.0, callback=None, on_annotation=None, reset=True):
+        """
+        Feeds a recording (see replaySource) through the same path as
+        startDataListener: parsing, subscribers, recording, spike detection and
+        live plot. speed is a multiple of real time, None replays as fast as
+        possible. stopDataListener stops it; the ReplayEngine is returned.
+        The time base always restarts with the recording; with reset the data
+        buffer, channel statistics and spike detector are cleared as well.
+        """
+        if self.running:
+            print("ERROR startReplay: listener already running")
+            return None
+        try:
+            rate = estimateRate(path)
+        except (OSError, ValueError) as e:
+            print(f"ERROR startReplay: {e}")
+            return None
+        if rate:
+            self.output_rate = rate
+        # An older recording than the last data would otherwise be clamped to its newest timestamp.
+        self.parser.last_timestamp = 0
+        self.last_sample_time = None
+        if reset:
+            self.data_buffer.clear()
+            self.channel_stats.reset()
+            if self.spike_detector:
+                self.spike_detector.reset()
+        self.running = True
+        self.replaying = True
+        self.listener_error = None
+        if callback:
+            self.listener_subscription = self.subscribe(callback, queue_size=10000, policy=POLICY_BLOCK, name="listener")
+        engine = ReplayEngine(self, path, speed=speed, on_annotation=on_annotation)
+
+        def replay():
+            try:
+                engine.run()
+            except Exception as e:
+                print(f"ERROR Replay: {e}")
+                self.listener_error = repr(e)
+            self.running = False
+        self.listener_thread = threading.Thread(target=replay, daemon = True)
+        self.listener_thread.start()
+        return engine
+
+    def recover(self):
+        """
+        Reconnects with exponential backoff until it succeeds or the listener is
+        stopped, then restores the sensor state. Each outage is appended to
+        self.outages and marked in the recording. Its start is the last sample
+        received, None if there was none yet.
+        """
+        outage_start = time.monotonic()
+        last_sample = self.parser.last_timestamp or None
+        self.dropConnection()
+
+        attempts = 0
+        delay = self.reconnect_delay
+        while self.running:
+            attempts += 1
+            if self.setupEthernet(new_session=False) and self.logIn() and self.restoreSettings():
+                break
+            self.dropConnection()
+            wait_until = time.monotonic() + delay
+            while self.running and time.monotonic() < wait_until:
+                time.sleep(0.05)
+            delay = min(delay * 2, self.reconnect_max_delay)
+        if not self.running:
+            return
+
+        # Samples the sensor would have sent between the last one received and the restart of the output.
+        period = self.samplePeriod()
+        resumed = self.clock.now()
+        lost = max(0, round((resumed - last_sample) / period) - 1) if period and last_sample else 0
+        outage = {
+            "start": last_sample,
+            "end": resumed,
+            "reconnect_time": time.monotonic() - outage_start,
+            "attempts": attempts,
+            "samples_lost": lost,
+        }
+        self.outages.append(outage)
+        self.missing_samples += lost
+        if self.recording and self.recorder and last_sample is not None:
+            self.recorder.mark(Marker(last_sample, f"GAP {(resumed - last_sample) / 1e9:.3f} s, {lost} samples lost", lost))
+        print(f"Reconnected after {outage['reconnect_time']:.2f} s ({attempts} attempts), {lost} samples lost")
+
+    def dropConnection(self):
+        """Closes the socket after a failure and cancels the commands still waiting for a reply."""
+        if self.sock:
+            try:
+                self.sock.close()
+            except socket.error:
+                pass
+            self.sock = None
+        with self.pending_lock:
+            while self.pending:
+                self.pending.popleft()[1].cancel()
+
+    def restoreSettings(self):
+        """Reapplies the last SE/COR/WTY settings and continuous output. Returns True if all were acknowledged."""
+        for query, data in self.settings.items():
+            if self.sendCommand(query, data) is None:
+                return False
+        if self.continuous_output and self.sendCommand("CO ON") is None:
+            return False
+        self.last_sample_time = None
+        return True
+
     def stopDataListener(self):
         self.running = False
         if self.listener_thread:
             self.listener_thread.join()
+        if self.listener_subscription:
+            self.unsubscribe(self.listener_subscription)
+            self.listener_subscription = None
         print("Data listener stopped.")
 
-    def getBufferedData(self):
-        
-        return self.data_buffer
+    def stats(self):
+        """Returns the acquisition health counters of the current connection as a dict."""
+        stats = {
+            "running": self.running,
+            "listener_error": self.listener_error,
+            "bytes_received": self.rx.bytes_received,
+            "sentences": self.rx.sentences,
+            "partial_sentences": self.rx.partial_count,
+            "garbled_lines": self.rx.garbled_count,
+            "parsed": self.parser.parsed,
+            "parse_failures": self.parser.parse_failures,
+            "checksum_failures": self.parser.checksum_failures,
+            "gaps": self.gaps,
+            "missing_samples": self.missing_samples,
+            "timeouts": self.timeouts,
+            "command_timeouts": self.command_timeouts,
+            "reconnects": len(self.outages),
+            "outage_samples_lost": sum(outage["samples_lost"] for outage in self.outages),
+            "spikes": self.spike_detector.detections if self.spike_detector else 0,
+            "buffered": len(self.data_buffer),
+            "buffer_overflow": self.data_buffer.overflow,
+            "subscribers": [subscription.stats() for subscription in self.subscribers],
+        }
+        if self.recorder:
+            stats.update({f"recorder_{key}": value for key, value in self.recorder.stats().items()})
+        if self.publisher:
+            stats.update({f"publisher_{key}": value for key, value in self.publisher.stats().items()})
+        return stats
+
+    def resetStats(self):
+        """Zeroes the health counters, e.g. at the start of a run."""
+        self.rx.bytes_received = self.rx.sentences = self.rx.partial_count = self.rx.garbled_count = 0
+        self.parser.parsed = self.parser.parse_failures = self.parser.checksum_failures = 0
+        self.timeouts = self.command_timeouts = self.gaps = self.missing_samples = 0
+        self.listener_error = None
+
+    def printStats(self):
+        stats = self.stats()
+        line = (f"STATS {stats['bytes_received']} B, {stats['parsed']} samples, "
+                f"{stats['parse_failures']} parse / {stats['checksum_failures']} checksum failures, "
+                f"{stats['gaps']} gaps ({stats['missing_samples']} missing), {stats['timeouts']} timeouts")
+        for subscriber in stats["subscribers"]:
+            line += (f", {subscriber['name']} lag max {subscriber['lag_max'] * 1000:.1f} ms"
+                     f" ({subscriber['queue_depth']} queued, {subscriber['dropped']} dropped)")
+        if self.recorder:
+            line += f", recorder queue {stats['recorder_queue_depth']} ({stats['recorder_dropped_samples']} dropped)"
+        print(line)
+
+    def getBufferedData(self, last_n=None, last_seconds=None):
+        """
+        Returns a zero-copy view of the buffered samples as a structured array.
+        Optionally only the last N samples or the last T seconds.
+        The number of overwritten samples is in self.data_buffer.overflow.
+        """
+        if last_seconds is not None:
+            return self.data_buffer.lastSeconds(last_seconds)
+        return self.data_buffer.last(last_n)
     
 
-    def startRecording(self, filename):
+    def startRecording(self, filename, header=CSV_HEADER, flush_interval=1.0, fsync=FSYNC_CLOSE,
+                       max_bytes=None, max_seconds=None, compression=None):
+        """
+        Records all samples to a CSV file, to the binary format if the filename
+        ends in .mda3, or to the crash-safe journal format for .mdaj. Rows are written in batches by a background writer thread,
+        flushed every flush_interval seconds and fsynced according to fsync
+        ("never", "flush" or "close").
+        With max_bytes or max_seconds the recording rotates into numbered segments
+        listed in a manifest, and compression ("gzip" or "zstd") compresses them;
+        see rotatingRecording.SessionReader to read them back as one stream.
+        Journal recordings cannot be rotated or compressed.
+        """
         try:
-            self.record_file = open(filename, mode='w', newline='')
-            self.record_writer = csv.writer(self.record_file)
-            self.record_writer.writerow([
-                "Timestamp", "RH1", "RH1R", "RL1", "RL1R", "TYPE", "DIS", "DIM", "CHECKSUM"
-
-            ])
+            if max_bytes is not None or max_seconds is not None or compression is not None:
+                sink = RotatingSink(filename, header, max_bytes=max_bytes, max_seconds=max_seconds, compression=compression)
+                filename = sink.filename
+            elif filename.endswith(JOURNAL_EXTENSION):
+                sink = JournalSink(filename)
+            elif filename.endswith(BINARY_EXTENSION):
+                sink = BinarySink(filename)
+            else:
+                sink = CsvSink(filename, header)
+            self.recorder = RecordingWriter(sink, flush_interval=flush_interval, fsync=fsync)
             self.recording = True
             print(f"Recording started: {filename}")
         except Exception as e:
             print(f"ERROR, startRecording: {e}")
 
     def stopRecording(self):
-        if self.recording:
+        if self.recorder:
+            self.recording = False
             try:
-                self.record_file.close()
-                print("Recording stopped.")
+                self.recorder.close()
+                stats = self.recorder.stats()
+                print(f"Recording stopped. {stats['written_samples']} samples written, "
+                      f"{stats['dropped_samples']} dropped, queue high water {stats['queue_high_water']}, "
+                      f"max write {stats['write_latency_max'] * 1000:.1f} ms.")
+                if stats["error"]:
+                    print(f"ERROR stopRecording: writer failed with {stats['error']}")
             except Exception as e:
                 print(f"ERROR stopRecording: {e}")
         self.recording = False
-        self.record_file = None
-        self.record_writer = None
+        self.recorder = None
 
-    def startLivePlot(self):
-        
+    def startLivePlot(self, window_seconds=10):
+        """Shows RH1/RL1 over the last window_seconds. Blocks until the window is closed."""
+        # Imported here so headless acquisition never loads matplotlib.
+        try:
+            from livePlot import LivePlot
+        except ImportError as e:
+            print(f"ERROR startLivePlot: {e}")
+            return
         self.plotting = True
-        fig, ax = plt.subplots()
-        rh1_line, = ax.plot([], [], label="RH1", color="blue")
-        rl1_line, = ax.plot([], [], label="RL1", color="red")
-
-        ax.set_ylim(0, 10000)
-        ax.set_xlim(0, self.plot_buffer_size)
-        ax.legend()
-        ax.set_title("Sensor Reading")
-        ax.set_xlabel("Sample #")
-        ax.set_ylabel("mV")
-
-        def update(frame):
-            if len(self.rh1_buffer) < 2:
-                return rh1_line, rl1_line
-
-            x = list(range(len(self.rh1_buffer)))
-            rh1_line.set_data(x, list(self.rh1_buffer))
-            rl1_line.set_data(x, list(self.rl1_buffer))
-
-            ax.set_xlim(max(0, len(x) - self.plot_buffer_size), len(x))
-            ax.set_ylim(
-                min(min(self.rh1_buffer), min(self.rl1_buffer)) * 0.9,
-                max(max(self.rh1_buffer), max(self.rl1_buffer)) * 1.1
-            )
-
-            return rh1_line, rl1_line
-
-        self.animation = FuncAnimation(fig, update, interval=200, cache_frame_data=False)
-        plt.tight_layout()
-        plt.show()
+        self.live_plot = LivePlot(self, window_seconds=window_seconds)
+        self.live_plot.show()
         self.plotting = False
 
     
@@ -302,11 +756,45 @@ class CEIACWDDW_Driver:
     
     def sensitivity(self, data = None): 
         response = self.sendCommand("SE", data)
+        if response is not None and data is not None:
+            self.settings["SE"] = data
         return response
 
     def readStatus(self):
         response = self.sendCommand("STA")
         return response
+
+    def waitUntilReady(self, timeout=30, initial_interval=0.05, max_interval=0.5):
+        """
+        Polls STA until the sensor is no longer settling, or reports a fault.
+        The poll interval starts at initial_interval and grows by half each time
+        up to max_interval. Returns the last SensorStatus with the time waited
+        in elapsed (ready is False on fault or timeout), or None if STA never answered.
+        """
+        start = time.monotonic()
+        interval = initial_interval
+        status = None
+        while True:
+            decoded = decodeStatus(self.readStatus(), time.monotonic() - start)
+            if decoded is not None:
+                status = decoded
+                if status.ready or status.fault:
+                    break
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 1.5, max_interval)
+
+        if status is None:
+            print(f"ERROR waitUntilReady: no status after {timeout} s")
+        elif status.fault:
+            print(f"ERROR waitUntilReady: sensor fault, STA {status.code}")
+        elif not status.ready:
+            print(f"ERROR waitUntilReady: still settling after {timeout} s")
+        else:
+            print(f"Sensor ready after {status.elapsed:.2f} s")
+        return status
     
     def readWorkingTime(self):
         response = self.sendCommand("WT")
@@ -343,18 +831,35 @@ class CEIACWDDW_Driver:
             response = self.sendCommand("WTY SW")
         else:
             response = self.sendCommand("WTY")
+        if response is not None and water_type in (1, 2):
+            self.settings["WTY"] = "FS" if water_type == 1 else "SW"
         return response
     
     def startContinuousOutput(self):
+        self.last_sample_time = None  # A pause in output is not a gap
         response = self.sendCommand("CO ON")
+        if response is not None:
+            self.continuous_output = True
         return response
     
     def stopContinuousOutput(self):
         response = self.sendCommand("CO OFF")
+        self.last_sample_time = None
+        if response is not None:
+            self.continuous_output = False
         return response   
 
     def outputRate(self, data = None):
         response = self.sendCommand("COR", data)
+        if response is not None:
+            # Remember the rate for timestamping, from the value set or the queried reply ("COR 50").
+            try:
+                self.output_rate = float(data if data is not None else response.split()[-1])
+                self.last_sample_time = None
+                if data is not None:
+                    self.settings["COR"] = data
+            except (ValueError, IndexError):
+                pass
         return response
     
     """-------------------------   Commands end   -------------------------"""
@@ -402,4 +907,5 @@ if __name__ == "__main__":
                     print("Response:", metalDetectorDriver.sendCommand(query, data))
     finally:    
         metalDetectorDriver.stopDataListener()
+        metalDetectorDriver.stopRecording()
         metalDetectorDriver.closeEthernet()
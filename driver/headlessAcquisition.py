@@ -0,0 +1,90 @@
+"""
+Headless acquisition for the vehicle computer: connects, configures the
+sensor, records and keeps the connection supervised until stopped with
+Ctrl-C, SIGTERM or after --duration seconds. Never imports matplotlib.
+
+    python headlessAcquisition.py --ip 192.168.1.202 --rate 50 --output dive.mda3 --stats-interval 10
+"""
+import argparse
+import signal
+import threading
+from datetime import datetime
+
+from ceiaSensorDriver import CEIACWDDW_Driver
+from journalRecording import JOURNAL_EXTENSION
+
+
+def runAcquisition(args):
+    driver = CEIACWDDW_Driver(ip=args.ip, port=args.port, timeout=args.timeout)
+
+    if not driver.setupEthernet():
+        print("Failed to establish connection.")
+        return 1
+    if not driver.logIn():
+        print("Failed to log in.")
+        driver.closeEthernet()
+        return 1
+
+    if args.sensitivity is not None:
+        driver.sensitivity(args.sensitivity)
+    if args.rate is not None:
+        driver.outputRate(args.rate)
+    else:
+        driver.outputRate()  # Query, so timestamps and gap checks know the sensor's rate
+    if args.water_type is not None:
+        driver.waterType(1 if args.water_type == "FS" else 2)
+
+    output = args.output or f"sensor_data_{datetime.now().strftime('%d%m%y_%H%M%S')}.mda3"
+    driver.startRecording(output, max_bytes=args.segment_mb * 1024 * 1024 if args.segment_mb else None,
+                          max_seconds=args.segment_minutes * 60 if args.segment_minutes else None,
+                          compression=args.compression)
+    if not driver.recording:
+        driver.closeEthernet()
+        return 1
+    if args.shared_feed:
+        driver.startSharedFeed(args.shared_feed)
+    if args.publish_port is not None:
+        driver.startPublisher(port=args.publish_port, udp_port=args.publish_udp_port)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    driver.startContinuousOutput()
+    driver.startDataListener(stats_interval=args.stats_interval, reconnect=not args.no_reconnect)
+    try:
+        stop.wait(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.stopDataListener()
+        driver.stopContinuousOutput()
+        driver.stopRecording()
+        driver.stopSharedFeed()
+        driver.stopPublisher()
+        driver.closeEthernet()
+        driver.printStats()
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ip", default="192.168.1.202")
+    parser.add_argument("--port", type=int, default=23)
+    parser.add_argument("--timeout", type=float, default=3)
+    parser.add_argument("--sensitivity", type=int, default=None, help="SE value, unchanged if omitted")
+    parser.add_argument("--rate", type=int, default=None, help="COR output rate in Hz, unchanged if omitted")
+    parser.add_argument("--water-type", choices=["FS", "SW"], default=None)
+    parser.add_argument("--output", default=None, help=".mda3 for binary, .mdaj for the crash-safe journal, anything else for CSV")
+    parser.add_argument("--segment-mb", type=float, default=None, help="rotate the recording at this size")
+    parser.add_argument("--segment-minutes", type=float, default=None, help="rotate the recording after this time")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+    parser.add_argument("--duration", type=float, default=None, help="seconds, runs until stopped if omitted")
+    parser.add_argument("--stats-interval", type=float, default=None, help="seconds between stats lines")
+    parser.add_argument("--shared-feed", default=None, metavar="NAME", help="publish samples to a shared memory ring")
+    parser.add_argument("--publish-port", type=int, default=None, help="re-publish samples on this local TCP port")
+    parser.add_argument("--publish-udp-port", type=int, default=None, help="and on this UDP port")
+    parser.add_argument("--no-reconnect", action="store_true", help="stop on connection loss instead of reconnecting")
+    args = parser.parse_args()
+    if args.output and args.output.endswith(JOURNAL_EXTENSION) and (args.segment_mb or args.segment_minutes or args.compression):
+        parser.error(".mdaj journals cannot be rotated or compressed")
+    raise SystemExit(runAcquisition(args))
@@ -0,0 +1,239 @@
+"""
+Crash-safe recording format: an append-only journal of checksummed blocks.
+
+    header   32 bytes   magic "CEIAJRNL", version, record size, creation time (ns)
+    blocks   32 byte block header + count records of binaryRecording.RECORD_DTYPE
+
+    block header   magic "BLK1", type, count, first and last timestamp (ns),
+                   crc32 over the header fields before it and the records
+
+Samples are collected into data blocks of up to block_records records; a
+block is also closed at every flush of the RecordingWriter. At most every
+sync_interval seconds the sink fsyncs and appends a sync block, so
+everything before the last sync block is known to be on disk. After a
+power loss recoverJournal() keeps every block up to the first torn or
+corrupt one, truncates the rest and writes a time index (<file>.idx) of
+block offsets that readJournalRange() uses to seek straight to a time span.
+
+    python journalRecording.py recover dive.mdaj
+"""
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from binaryRecording import FLAG_MARKER, RECORD_DTYPE, samplesToRecords
+
+
+JOURNAL_EXTENSION = ".mdaj"
+JOURNAL_MAGIC = b"CEIAJRNL"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<8sHHq12x")
+BLOCK_MAGIC = b"BLK1"
+BLOCK_HEADER = struct.Struct("<4sB3xIqqI")
+BLOCK_CRC_OFFSET = BLOCK_HEADER.size - 4
+
+# Block types
+BLOCK_DATA = 0
+BLOCK_SYNC = 1  # Everything before it was fsynced
+
+INDEX_EXTENSION = ".idx"
+INDEX_DTYPE = np.dtype([("first", "<i8"), ("last", "<i8"), ("offset", "<i8"), ("count", "<i4")])
+
+
+def packBlock(block_type, records):
+    count = len(records)
+    first = int(records["Timestamp"][0]) if count else 0
+    last = int(records["Timestamp"][-1]) if count else 0
+    payload = records.tobytes()
+    head = BLOCK_HEADER.pack(BLOCK_MAGIC, block_type, count, first, last, 0)[:BLOCK_CRC_OFFSET]
+    crc = zlib.crc32(payload, zlib.crc32(head))
+    return head + struct.pack("<I", crc) + payload
+
+
+class JournalSink:
+    """Sink for RecordingWriter that writes the journal format. Same interface as CsvSink."""
+
+    def __init__(self, filename, sync_interval=1.0, block_records=256):
+        self.filename = filename
+        self.sync_interval = sync_interval
+        self.block_records = block_records
+        self.pending = []  # Record arrays not yet written as a block
+        self.file = open(filename, mode='wb')
+        self.file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, RECORD_DTYPE.itemsize, time.time_ns()))
+        self.index = []  # (first, last, offset, count) of every data block
+        self.last_sync = time.monotonic()
+        self.sync()
+
+    def write(self, samples):
+        self.writeRecords(samplesToRecords(samples))
+
+    def writeRecords(self, records):
+        records = np.ascontiguousarray(records, dtype=RECORD_DTYPE)
+        if len(records) == 0:
+            return
+        self.pending.append(records)
+        if sum(len(part) for part in self.pending) >= self.block_records:
+            self.writeBlock()
+
+    def writeBlock(self):
+        if not self.pending:
+            return
+        records = np.concatenate(self.pending) if len(self.pending) > 1 else self.pending[0]
+        self.pending = []
+        offset = self.file.tell()
+        self.file.write(packBlock(BLOCK_DATA, records))
+        self.index.append((int(records["Timestamp"][0]), int(records["Timestamp"][-1]), offset, len(records)))
+
+    def writeMarker(self, marker):
+        # Marker record: FLAGS has FLAG_MARKER set and RH1 holds the number of samples lost.
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record["Timestamp"] = marker.Timestamp
+        record["RH1"] = marker.lost
+        record["FLAGS"] = FLAG_MARKER
+        self.writeRecords(record)
+
+    def flush(self):
+        self.writeBlock()
+        self.file.flush()
+        if time.monotonic() - self.last_sync >= self.sync_interval:
+            self.sync()
+
+    def sync(self):
+        """Makes everything written so far durable and marks it with a sync block."""
+        self.writeBlock()
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.write(packBlock(BLOCK_SYNC, np.zeros(0, dtype=RECORD_DTYPE)))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+        writeIndex(self.filename, np.array(self.index, dtype=INDEX_DTYPE))
+
+
+def scanJournal(filename):
+    """
+    Walks the blocks of a journal and stops at the first torn or corrupt one.
+    Returns (index, good_end, last_sync_end, file_size): the INDEX_DTYPE entries
+    of the valid data blocks, where the valid part ends and where the last sync block ends.
+    """
+    with open(filename, "rb") as file:
+        raw = file.read(JOURNAL_HEADER.size)
+        if len(raw) < JOURNAL_HEADER.size:
+            raise ValueError(f"{filename}: file too short for a journal header")
+        magic, version, record_size, _ = JOURNAL_HEADER.unpack(raw)
+        if magic != JOURNAL_MAGIC:
+            raise ValueError(f"{filename}: not a journal recording")
+        if version != JOURNAL_VERSION or record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{filename}: unsupported journal version {version} (record size {record_size})")
+
+        size = os.fstat(file.fileno()).st_size
+        index = []
+        good_end = last_sync_end = JOURNAL_HEADER.size
+        while True:
+            offset = good_end
+            head = file.read(BLOCK_HEADER.size)
+            if len(head) < BLOCK_HEADER.size:
+                break
+            magic, block_type, count, first, last, crc = BLOCK_HEADER.unpack(head)
+            length = count * RECORD_DTYPE.itemsize
+            if magic != BLOCK_MAGIC or block_type not in (BLOCK_DATA, BLOCK_SYNC) or offset + BLOCK_HEADER.size + length > size:
+                break
+            payload = file.read(length)
+            if zlib.crc32(payload, zlib.crc32(head[:BLOCK_CRC_OFFSET])) != crc:
+                break
+            good_end = offset + BLOCK_HEADER.size + length
+            if block_type == BLOCK_SYNC:
+                last_sync_end = good_end
+            elif count:
+                index.append((first, last, offset, count))
+    return np.array(index, dtype=INDEX_DTYPE), good_end, last_sync_end, size
+
+
+def writeIndex(filename, index):
+    temporary = filename + INDEX_EXTENSION + ".tmp"
+    index.tofile(temporary)
+    os.replace(temporary, filename + INDEX_EXTENSION)
+
+
+def loadIndex(filename):
+    """Returns the block index of a journal, rebuilt by scanning if the .idx file is missing or stale."""
+    path = filename + INDEX_EXTENSION
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(filename):
+        return np.fromfile(path, dtype=INDEX_DTYPE)
+    return scanJournal(filename)[0]
+
+
+def recoverJournal(filename, truncate=True):
+    """
+    Checks a journal after a crash: keeps every valid block and, if truncate is
+    set, cuts off the torn or corrupt tail and rewrites the time index. Without
+    truncate nothing is written.
+    Returns a dict with what was kept and what was cut off.
+    """
+    index, good_end, last_sync_end, size = scanJournal(filename)
+    if truncate and good_end < size:
+        with open(filename, "r+b") as file:
+            file.truncate(good_end)
+            file.flush()
+            os.fsync(file.fileno())
+    if truncate:
+        writeIndex(filename, index)
+    return {
+        "blocks": len(index),
+        "records": int(index["count"].sum()) if len(index) else 0,
+        "first_ns": int(index["first"][0]) if len(index) else None,
+        "last_ns": int(index["last"][-1]) if len(index) else None,
+        "valid_bytes": good_end,
+        "synced_bytes": last_sync_end,
+        "truncated_bytes": size - good_end,
+    }
+
+
+def readJournal(filename):
+    """Returns the records of all valid blocks as one RECORD_DTYPE array, without modifying the file."""
+    return readJournalRange(filename)
+
+
+def readJournalRange(filename, start_ns=None, end_ns=None):
+    """Returns the records with start_ns <= Timestamp <= end_ns, reading only the blocks the index points to."""
+    index = loadIndex(filename)
+    if start_ns is not None:
+        index = index[index["last"] >= start_ns]
+    if end_ns is not None:
+        index = index[index["first"] <= end_ns]
+
+    parts = []
+    with open(filename, "rb") as file:
+        for _, _, offset, count in index.tolist():
+            file.seek(offset + BLOCK_HEADER.size)
+            parts.append(np.frombuffer(file.read(count * RECORD_DTYPE.itemsize), dtype=RECORD_DTYPE))
+    records = np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+    if start_ns is not None:
+        records = records[records["Timestamp"] >= start_ns]
+    if end_ns is not None:
+        records = records[records["Timestamp"] <= end_ns]
+    return records
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("recover", "check", "index"):
+        print(f"Usage: python {os.path.basename(__file__)} recover|check|index <file{JOURNAL_EXTENSION}>")
+        sys.exit(1)
+
+    command, filename = sys.argv[1], sys.argv[2]
+    if command == "index":
+        writeIndex(filename, scanJournal(filename)[0])
+        print(f"Index written to {filename}{INDEX_EXTENSION}")
+    else:
+        result = recoverJournal(filename, truncate=command == "recover")
+        action = "truncated" if command == "recover" else "would be truncated"
+        print(f"{result['records']} records in {result['blocks']} blocks, {result['synced_bytes']} of "
+              f"{result['valid_bytes']} valid bytes synced, {result['truncated_bytes']} bytes {action}")
@@ -0,0 +1,108 @@
+import numpy as np
+import matplotlib.pyplot as plt
+
+
+def minMaxDecimate(x, y, n_bins):
+    """
+    Reduces y to the min and max of n_bins equal slices, in time order, so
+    spikes survive decimation. Returns x and y unchanged if they are already short.
+    """
+    if len(y) <= 2 * n_bins:
+        return x, y
+    per_bin = len(y) // n_bins
+    start = len(y) - per_bin * n_bins
+    bins = y[start:].reshape(n_bins, per_bin)
+
+    index = np.stack((bins.argmin(axis=1), bins.argmax(axis=1)), axis=1)
+    index.sort(axis=1)
+    index += (np.arange(n_bins) * per_bin + start)[:, None]
+    index = index.ravel()
+    return x[index], y[index]
+
+
+class LivePlot:
+    """
+    Live RH1/RL1 view over the last window_seconds of the driver's ring buffer.
+
+    Each frame copies a snapshot of the window under the ring buffer lock,
+    min/max decimates it to max_points per channel and blits only the two
+    lines over a cached background. The axes are only fully redrawn when the
+    y range has to change, so the frame cost does not grow with the output rate.
+    """
+
+    CHANNELS = (("RH1", "blue"), ("RL1", "red"))
+
+    def __init__(self, driver, window_seconds=10, interval_ms=100, max_points=2000):
+        self.driver = driver
+        self.window_seconds = window_seconds
+        self.interval_ms = interval_ms
+        self.n_bins = max(1, max_points // 2)
+
+        self.fig = None
+        self.ax = None
+        self.lines = []
+        self.background = None
+        self.timer = None
+
+    def show(self):
+        """Opens the plot window and blocks until it is closed."""
+        self.fig, self.ax = plt.subplots()
+        self.lines = [
+            self.ax.plot([], [], label=channel, color=color, animated=True)[0]
+            for channel, color in self.CHANNELS
+        ]
+
+        self.ax.set_ylim(0, 10000)
+        self.ax.set_xlim(-self.window_seconds, 0)
+        self.ax.legend()
+        self.ax.set_title("Sensor Reading")
+        self.ax.set_xlabel("Seconds")
+        self.ax.set_ylabel("mV")
+        plt.tight_layout()
+
+        # Every full redraw (start, resize, new y limits) refreshes the cached background.
+        self.fig.canvas.mpl_connect("draw_event", self.onDraw)
+        self.timer = self.fig.canvas.new_timer(interval=self.interval_ms)
+        self.timer.add_callback(self.update)
+        self.timer.start()
+        plt.show()
+        self.timer.stop()
+
+    def onDraw(self, event):
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+
+    def update(self):
+        data = self.driver.data_buffer.snapshot(last_seconds=self.window_seconds, fields=("Timestamp", "RH1", "RL1"))
+        if len(data) < 2 or self.background is None:
+            return
+
+        x = (data["Timestamp"] - data["Timestamp"][-1]) / 1e9
+        low, high = np.inf, -np.inf
+        for line, (channel, _) in zip(self.lines, self.CHANNELS):
+            line_x, line_y = minMaxDecimate(x, data[channel], self.n_bins)
+            line.set_data(line_x, line_y)
+            low = min(low, line_y.min())
+            high = max(high, line_y.max())
+
+        if self.rescale(low, high):
+            # New limits change the ticks, let the full redraw recache the background.
+            self.fig.canvas.draw_idle()
+            return
+
+        canvas = self.fig.canvas
+        canvas.restore_region(self.background)
+        for line in self.lines:
+            self.ax.draw_artist(line)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def rescale(self, low, high):
+        """Adjusts the y limits if the data left them or uses less than a third of them."""
+        bottom, top = self.ax.get_ylim()
+        span = max(high - low, 1)
+        if low >= bottom and high <= top and (top - bottom) < 3 * span:
+            return False
+        self.ax.set_ylim(low - 0.1 * span, high + 0.1 * span)
+        return True
@@ -0,0 +1,126 @@
+from collections import namedtuple
+from itertools import repeat
+
+import numpy as np
+
+
+# One parsed $MDA3 sentence. Field names match the keys of the old dict and the CSV header.
+# Timestamp is an integer in ns since the epoch, see SessionClock.
+MDA3Sample = namedtuple("MDA3Sample", ["Timestamp", "RH1", "RH1R", "RL1", "RL1R", "TYPE", "DIS", "DIM", "CHECKSUM"])
+
+MDA3_TYPES = frozenset(("N", "F", "NN", "NF", "FN", "FF"))
+MDA3_SIZES = frozenset(("N", "S", "M", "L"))
+BATCH_CHECKSUM_MIN = 32  # From this many sentences the checksums are screened in one numpy pass
+
+HEX_VALUES = np.full(256, -256, dtype=np.int16)  # Value of each hex digit character, negative otherwise
+for digit in "0123456789abcdefABCDEF":
+    HEX_VALUES[ord(digit)] = int(digit, 16)
+
+
+def nmeaChecksum(body):
+    """XOR of all characters between '$' and '*', as used by NMEA style sentences."""
+    checksum = 0
+    for byte in body.encode("ascii"):
+        checksum ^= byte
+    return checksum
+
+
+def checksumSuspects(lines, stars):
+    """
+    Screens a chunk in one numpy pass: False for every line whose two hex digits
+    after stars[i] match the XOR of its body, True where it needs the exact check.
+    """
+    data = np.frombuffer(("".join(lines) + "\0" * 4).encode("ascii", "replace"), dtype=np.uint8)
+    running = np.bitwise_xor.accumulate(data)
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    starts = np.cumsum(lengths) - lengths
+    star = np.maximum(np.array(stars, dtype=np.int64), 1)
+    position = starts + star
+    # running[star - 1] ^ running[start] is the XOR of the bytes after the '$' up to the '*'.
+    computed = running[position - 1] ^ running[starts]
+    expected = HEX_VALUES[data[position + 1]] * 16 + HEX_VALUES[data[position + 2]]
+    return ((computed != expected) | (star + 3 > lengths)).tolist()
+
+
+def formatMDA3(rh1, rh1r, rl1, rl1r, dtype, dis, dim):
+    """Builds a $MDA3 sentence with a valid checksum, without line terminator."""
+    body = f"MDA3,{rh1},{rh1r},{rl1},{rl1r},{dtype},{dis},{dim}"
+    return f"${body}*{nmeaChecksum(body):02X}"
+
+
+class MDA3Parser:
+    """
+    Split based parser for $MDA3 sentences.
+
+    $MDA3,<RH1>,<RH1R>,<RL1>,<RL1R>,<TYPE>,<DIS>,<DIM>*<checksum>
+
+    Sentences with a wrong field count, non numeric channels, unknown TYPE/DIM
+    or (if validate_checksum is set) a checksum mismatch are rejected and counted.
+    """
+
+    def __init__(self, validate_checksum=True):
+        self.validate_checksum = validate_checksum
+        self.parsed = 0
+        self.parse_failures = 0
+        self.checksum_failures = 0
+        self.last_timestamp = 0
+
+    def parse(self, line, timestamp=0):
+        """Parses one sentence. Returns an MDA3Sample or None."""
+        samples = self.parseBatch((line,), timestamp)
+        return samples[0] if samples else None
+
+    def parseBatch(self, lines, timestamp=0, period_ns=0):
+        """
+        Parses a list of sentences received together. Failed sentences are skipped.
+
+        timestamp (ns) belongs to the last sentence, earlier ones are spread back
+        by period_ns (the sensor's output period). Timestamps never go backwards
+        across batches.
+        """
+        samples = []
+        append = samples.append
+        validate = self.validate_checksum
+        types = MDA3_TYPES
+        sizes = MDA3_SIZES
+        last = self.last_timestamp
+        sample_time = timestamp - (len(lines) - 1) * period_ns - period_ns
+        if validate and len(lines) >= BATCH_CHECKSUM_MIN:
+            suspects = checksumSuspects(lines, [line.rfind("*") for line in lines])
+        else:
+            suspects = repeat(validate)  # Check each one, or none
+
+        for line, suspect in zip(lines, suspects):
+            sample_time += period_ns
+            star = line.rfind("*")
+            if star < 6 or not line.startswith("$MDA3,"):
+                self.parse_failures += 1
+                continue
+
+            checksum = line[star + 1:star + 3]
+            if suspect:
+                try:
+                    expected = int(checksum, 16)
+                except ValueError:
+                    expected = -1
+                if expected != nmeaChecksum(line[1:star]):
+                    self.checksum_failures += 1
+                    continue
+
+            fields = line[6:star].split(",")
+            if len(fields) != 7:
+                self.parse_failures += 1
+                continue
+            rh1, rh1r, rl1, rl1r, dtype, dis, dim = fields
+            if dtype not in types or dim not in sizes:
+                self.parse_failures += 1
+                continue
+            try:
+                append(MDA3Sample(sample_time if sample_time > last else last, int(rh1), int(rh1r), int(rl1), int(rl1r), dtype, int(dis), dim, checksum))
+            except ValueError:
+                self.parse_failures += 1
+
+        self.parsed += len(samples)
+        if samples:
+            self.last_timestamp = samples[-1].Timestamp
+        return samples
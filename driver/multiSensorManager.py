@@ -0,0 +1,161 @@
+import selectors
+import socket
+import threading
+
+from ceiaSensorDriver import CEIACWDDW_Driver
+from sensorProfiles import PROFILE_FIELDS
+
+
+class CEIASensorManager:
+    """
+    Owns several CEIA sensor connections and reads all of them on one thread.
+
+    Login and configuration go through each sensor's CEIACWDDW_Driver. Once
+    started, one selector loop does the reading and dispatching for all
+    sockets, so a detector costs no thread of its own. Commands can still be
+    sent to a single sensor with manager.sensors[sensor_id].sendCommand(...),
+    but not from inside the callback, which runs on the selector thread.
+
+        manager = CEIASensorManager(callback=onSample)
+        manager.addSensor("metal_detector_0", "192.168.1.202", config={"SE": 127, "COR": 50})
+        manager.addSensor("metal_detector_1", "192.168.1.203", config={"SE": 127, "COR": 50})
+        manager.connect()
+        manager.start()
+    """
+
+    def __init__(self, callback=None, select_timeout=0.5):
+        self.callback = callback  # callback(sensor_id, sample)
+        self.select_timeout = select_timeout
+        self.sensors = {}
+        self.configs = {}
+        self.callback_errors = {}  # sensor_id -> exceptions raised by the callback
+        self.selector = selectors.DefaultSelector()
+        self.running = False
+        self.thread = None
+
+    def addSensor(self, sensor_id, ip, port=23, pin=None, config=None, **kwargs):
+        """Adds a sensor. config maps commands to values, e.g. {"SE": 127, "COR": 50, "WTY": "FS"}."""
+        driver = CEIACWDDW_Driver(ip=ip, port=port, **kwargs)
+        driver.sensor_id = sensor_id
+        if pin is not None:
+            driver.pin = pin
+        self.sensors[sensor_id] = driver
+        self.configs[sensor_id] = dict(config or {})
+        self.callback_errors[sensor_id] = 0
+        return driver
+
+    def connect(self, sensor_ids=None):
+        """Connects, logs in and configures the given (default all) sensors. Returns the ids that succeeded."""
+        connected = []
+        for sensor_id in sensor_ids or list(self.sensors):
+            driver = self.sensors[sensor_id]
+            if not driver.setupEthernet():
+                print(f"ERROR connect: {sensor_id} not reachable.")
+                continue
+            if not driver.logIn():
+                print(f"ERROR connect: {sensor_id} login failed.")
+                driver.closeEthernet()
+                continue
+            if not self.configure(sensor_id):
+                driver.closeEthernet()
+                continue
+            connected.append(sensor_id)
+        return connected
+
+    def configure(self, sensor_id, config=None):
+        """
+        Applies a sensor's configuration. Works before and after start().
+        Settings with a profile field (SE, COR, WTY, ...) go through applyProfile,
+        so the driver knows its output rate and can restore them on reconnect.
+        """
+        driver = self.sensors[sensor_id]
+        if config is not None:
+            self.configs[sensor_id].update(config)
+        profile_keys = {query: key for key, query in PROFILE_FIELDS}
+        profile = {}
+        commands = []
+        for query, data in self.configs[sensor_id].items():
+            if query.upper() in profile_keys:
+                profile[profile_keys[query.upper()]] = data
+            else:
+                commands.append((query, data))
+        if profile and not driver.applyProfile(profile):
+            print(f"ERROR configure: {sensor_id} did not accept {profile}.")
+            return False
+        for query, data in commands:
+            if driver.sendCommand(query, data) is None:
+                print(f"ERROR configure: {sensor_id} did not answer {query} {data}.")
+                return False
+        return True
+
+    def start(self, continuous_output=True):
+        """Starts continuous output on all connected sensors and the selector thread."""
+        for sensor_id, driver in self.sensors.items():
+            if not driver.sock:
+                continue
+            if continuous_output:
+                driver.startContinuousOutput()
+            # From here on the selector thread is the only reader of this socket.
+            driver.running = True
+            self.selector.register(driver.sock, selectors.EVENT_READ, driver)
+
+        self.running = True
+        self.thread = threading.Thread(target=self.selectLoop, daemon=True)
+        self.thread.start()
+
+    def selectLoop(self):
+        while self.running:
+            for key, _ in self.selector.select(self.select_timeout):
+                driver = key.data
+                try:
+                    lines = driver.rx.readLines(driver.sock)
+                except (socket.timeout, BlockingIOError):
+                    continue
+                except OSError as e:
+                    print(f"ERROR Listener {driver.sensor_id}: {e}")
+                    driver.listener_error = repr(e)
+                    self.selector.unregister(key.fileobj)
+                    driver.running = False
+                    continue
+
+                # One failing sensor or callback must not stop the loop that reads all of them.
+                try:
+                    _, samples = driver.dispatchLines(lines, driver.clock.now())
+                except Exception as e:
+                    print(f"ERROR Listener {driver.sensor_id}: {e}")
+                    driver.listener_error = repr(e)
+                    continue
+                if self.callback:
+                    for sample in samples:
+                        try:
+                            self.callback(driver.sensor_id, sample)
+                        except Exception as e:
+                            self.callback_errors[driver.sensor_id] += 1
+                            print(f"ERROR Callback {driver.sensor_id}: {e}")
+
+    def stop(self):
+        """Stops the selector thread. Sensors stay connected and can be read again with start()."""
+        self.running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        for driver in self.sensors.values():
+            if driver.sock and driver.running:
+                self.selector.unregister(driver.sock)
+            driver.running = False
+
+    def close(self):
+        """Stops reading, ends continuous output and closes all connections."""
+        self.stop()
+        for driver in self.sensors.values():
+            if driver.sock:
+                driver.stopContinuousOutput()
+                driver.closeEthernet()
+
+    def getBufferedData(self, sensor_id, last_n=None, last_seconds=None):
+        return self.sensors[sensor_id].getBufferedData(last_n=last_n, last_seconds=last_seconds)
+
+    def stats(self):
+        """Returns the health counters of every sensor, keyed by sensor id."""
+        return {sensor_id: {**driver.stats(), "callback_errors": self.callback_errors[sensor_id]}
+                for sensor_id, driver in self.sensors.items()}
@@ -0,0 +1,192 @@
+import csv
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from sessionClock import isoTimestamp
+
+
+CSV_HEADER = ["Timestamp", "RH1", "RH1R", "RL1", "RL1R", "TYPE", "DIS", "DIM", "CHECKSUM"]
+
+# fsync policies
+FSYNC_NEVER = "never"   # Leave it to the OS
+FSYNC_FLUSH = "flush"   # fsync after every periodic flush
+FSYNC_CLOSE = "close"   # fsync once when the recording is closed
+
+# Annotation written between samples, e.g. where the connection was lost
+Marker = namedtuple("Marker", ["Timestamp", "text", "lost"])
+
+
+class CsvSink:
+    """Writes samples as rows of the driver's CSV layout, to filename or to an open text file."""
+
+    def __init__(self, filename, header=CSV_HEADER, file=None):
+        self.filename = filename
+        self.file = file if file is not None else open(filename, mode='w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+        self.file.flush()
+
+    def write(self, samples):
+        self.writer.writerows(
+            [isoTimestamp(sample.Timestamp), *sample[1:]] for sample in samples
+        )
+
+    def writeMarker(self, marker):
+        # Annotation row in the Timestamp column, like the THRUSTER CHANGE rows of the test harness.
+        self.writer.writerow([marker.text])
+
+    def flush(self):
+        self.file.flush()
+
+    def sync(self):
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class RecordingWriter:
+    """
+    Writes recorded samples on its own thread so disk stalls never block the socket reader.
+
+    The listener hands over whole batches through a bounded queue. If the
+    queue is full the batch is dropped and counted rather than blocking
+    acquisition. The writer drains everything queued into one write, flushes
+    every flush_interval seconds and fsyncs according to the fsync policy.
+    If the sink fails (e.g. disk full) the writer stops, keeps the exception
+    in self.error and drops whatever is submitted afterwards.
+    """
+
+    def __init__(self, sink, queue_size=1000, flush_interval=1.0, fsync=FSYNC_CLOSE):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        # Stats
+        self.queue_high_water = 0
+        self.dropped_batches = 0
+        self.dropped_samples = 0
+        self.written_samples = 0
+        self.writes = 0
+        self.write_time_total = 0.0
+        self.write_time_max = 0.0
+        self.error = None
+
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, samples):
+        """Queues a batch of samples for writing. Never blocks."""
+        if not samples:
+            return
+        try:
+            if self.error is not None:
+                raise queue.Full
+            self.queue.put_nowait(samples)
+        except queue.Full:
+            self.dropped_batches += 1
+            self.dropped_samples += len(samples)
+            return
+        self.updateHighWater()
+
+    def mark(self, marker):
+        """Queues a Marker behind the samples submitted so far."""
+        try:
+            if self.error is not None:
+                raise queue.Full
+            self.queue.put(marker, timeout=1.0)
+        except queue.Full:
+            self.dropped_batches += 1
+            return
+        self.updateHighWater()
+
+    def updateHighWater(self):
+        depth = self.queue.qsize()
+        if depth > self.queue_high_water:
+            self.queue_high_water = depth
+
+    def run(self):
+        try:
+            self.writeLoop()
+        except Exception as e:
+            self.error = e
+            print(f"ERROR RecordingWriter: {e!r}, recording stopped")
+            try:
+                self.sink.close()
+            except Exception:
+                pass
+
+    def writeLoop(self):
+        last_flush = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                batches = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                batches = []
+            while True:
+                try:
+                    batches.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batches:
+                closing = True
+                batches = [batch for batch in batches if batch is not None]
+
+            samples = []
+            for batch in batches:
+                if isinstance(batch, Marker):
+                    self.write(samples)
+                    samples = []
+                    self.sink.writeMarker(batch)
+                else:
+                    samples.extend(batch)
+            self.write(samples)
+
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self.sink.flush()
+                if self.fsync == FSYNC_FLUSH:
+                    self.sink.sync()
+                last_flush = time.monotonic()
+
+        self.sink.flush()
+        if self.fsync != FSYNC_NEVER:
+            self.sink.sync()
+        self.sink.close()
+
+    def write(self, samples):
+        if not samples:
+            return
+        start = time.perf_counter()
+        self.sink.write(samples)
+        elapsed = time.perf_counter() - start
+        self.writes += 1
+        self.written_samples += len(samples)
+        self.write_time_total += elapsed
+        self.write_time_max = max(self.write_time_max, elapsed)
+
+    def close(self):
+        """Writes everything still queued, then closes the file. Returns at once if the writer failed."""
+        while self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=1.0)
+                break
+            except queue.Full:
+                pass
+        self.thread.join()
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue.qsize(),
+            "queue_high_water": self.queue_high_water,
+            "dropped_batches": self.dropped_batches,
+            "dropped_samples": self.dropped_samples,
+            "written_samples": self.written_samples,
+            "write_latency_mean": self.write_time_total / self.writes if self.writes else 0.0,
+            "write_latency_max": self.write_time_max,
+            "error": repr(self.error) if self.error is not None else None,
+        }
@@ -0,0 +1,260 @@
+"""
+Replay of recorded sessions through the driver's live acquisition path.
+
+Recordings are turned back into $MDA3 sentences and handed to
+CEIACWDDW_Driver.dispatchLines, so parsing, subscribers, recording, spike
+detection, statistics and the live plot behave as with the sensor.
+Supported sources:
+
+    driver or test harness CSV     Timestamp, RH1, ... (THRUSTER CHANGE rows become annotations)
+    bag export, merged             Time, RH1, RH1R, RL1, RL1R (plotting/ROSBagExtraction.py)
+    bag export, per topic          a directory or the ...metal_detector_0-rh1.csv file with
+                                   Time, data; the rh1r, rl1 and rl1r files next to it
+    binary recordings              .mda3, .mdaj journals and rotated session manifests
+
+    python replaySource.py dive.csv --speed 10 --spikes
+"""
+import argparse
+import csv
+import glob
+import os
+import re
+import time
+
+import numpy as np
+
+from binaryRecording import BINARY_EXTENSION, DIM_NAMES, FLAG_MARKER, TYPE_NAMES, openBinaryRecording
+from journalRecording import JOURNAL_EXTENSION, readJournal
+from mda3Parser import formatMDA3
+from recordingWriter import Marker
+from rotatingRecording import MANIFEST_EXTENSION, SessionReader
+from sessionClock import parseIsoTimestamp
+
+
+BAG_TOPICS = ("rh1", "rh1r", "rl1", "rl1r")
+GAP_PATTERN = re.compile(r"GAP\b.*?(\d+) samples lost")
+
+
+def parseTimestampField(text):
+    try:
+        return parseIsoTimestamp(text)
+    except ValueError:
+        return None
+
+
+def readDriverCsv(filename):
+    """
+    Yields (timestamp ns, line) from a driver or test harness CSV. Annotation
+    rows are yielded as plain text: rows with THRUSTER in any column (older
+    harness files put it in RH1) or without a timestamp in the first column.
+    """
+    last = 0
+    with open(filename, newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        for row in reader:
+            if not row:
+                continue
+            try:
+                timestamp = parseIsoTimestamp(row[0])
+                last = timestamp
+                yield timestamp, formatMDA3(int(row[1]), int(row[2]), int(row[3]), int(row[4]), row[5], int(row[6]), row[7])
+            except (ValueError, IndexError):
+                timestamp = parseTimestampField(row[0])
+                if timestamp is not None and not any("THRUSTER" in field for field in row):
+                    continue  # A damaged sample row
+                text = next((field.strip() for field in row if field.strip() and parseTimestampField(field) is None), None)
+                if text:
+                    yield (timestamp if timestamp is not None else last), text
+
+
+def readMergedBagCsv(filename):
+    """Yields (timestamp ns, sentence) from the Time, RH1, RH1R, RL1, RL1R export of ROSBagExtraction."""
+    with open(filename, newline='') as file:
+        reader = csv.DictReader(file)
+        for row in reader:
+            try:
+                yield (int(float(row["Time"]) * 1e9),
+                       formatMDA3(int(float(row["RH1"])), int(float(row["RH1R"])), int(float(row["RL1"])), int(float(row["RL1R"])), "N", 0, "N"))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def findBagTopicFiles(path):
+    """Returns {topic: csv file} of the metal_detector_0 channels for a directory or one of the topic files."""
+    if os.path.isdir(path):
+        directory, prefix = path, None
+    else:
+        directory = os.path.dirname(path)
+        match = re.match(r"(.*)rh1r?\.csv$", os.path.basename(path))
+        prefix = match.group(1) if match else None
+    files = {}
+    for topic in BAG_TOPICS:
+        pattern = f"{prefix}{topic}.csv" if prefix else f"*metal_detector_0*{topic}.csv"
+        candidates = [name for name in glob.glob(os.path.join(glob.escape(directory), pattern))
+                      if re.search(rf"[-_/]{topic}\.csv$", name)]
+        if candidates:
+            files[topic] = sorted(candidates)[0]
+    missing = [topic for topic in BAG_TOPICS if topic not in files]
+    if missing:
+        raise FileNotFoundError(f"{path}: no bag export for {', '.join(missing)}")
+    return files
+
+
+def readBagTopics(path):
+    """Yields (timestamp ns, sentence) from per-topic bag exports, aligned by message index on the RH1 time base."""
+    columns = {}
+    for topic, filename in findBagTopicFiles(path).items():
+        with open(filename, newline='') as file:
+            reader = csv.DictReader(file)
+            columns[topic] = [(row["Time"], row["data"]) for row in reader]
+    count = min(len(values) for values in columns.values())
+    for i in range(count):
+        try:
+            timestamp = int(float(columns["rh1"][i][0]) * 1e9)
+            rh1, rh1r, rl1, rl1r = (int(float(columns[topic][i][1])) for topic in BAG_TOPICS)
+        except ValueError:
+            continue
+        yield timestamp, formatMDA3(rh1, rh1r, rl1, rl1r, "N", 0, "N")
+
+
+def readRecords(records):
+    """Yields (timestamp ns, line) from RECORD_DTYPE records; marker records become annotations."""
+    types = TYPE_NAMES[records["TYPE"]]
+    dims = DIM_NAMES[records["DIM"]]
+    for i, record in enumerate(records.tolist()):
+        if record[8] & FLAG_MARKER:
+            yield record[0], f"GAP, {record[1]} samples lost"
+        else:
+            yield record[0], formatMDA3(record[1], record[2], record[3], record[4], types[i], record[5], dims[i])
+
+
+def openReplaySource(path):
+    """Returns an iterator of (timestamp ns, line) for any supported recording, oldest first."""
+    if os.path.isdir(path):
+        return readBagTopics(path)
+    if path.endswith(MANIFEST_EXTENSION):
+        return readRecords(SessionReader(path).records())
+    if path.endswith(JOURNAL_EXTENSION):
+        return readRecords(readJournal(path))
+    if path.endswith(BINARY_EXTENSION):
+        return readRecords(np.asarray(openBinaryRecording(path)))
+
+    with open(path, newline='') as file:
+        header = next(csv.reader(file), [])
+    if header[:1] == ["Timestamp"]:
+        return readDriverCsv(path)
+    if "Time" in header and "RH1" in header:
+        return readMergedBagCsv(path)
+    if header == ["Time", "data"]:
+        return readBagTopics(path)
+    raise ValueError(f"{path}: unknown recording layout {header}")
+
+
+def estimateRate(path, count=200):
+    """Output rate in Hz from the median spacing of the first samples, None if it cannot be told."""
+    timestamps = []
+    for timestamp, line in openReplaySource(path):
+        if line.startswith("$MDA3"):
+            timestamps.append(timestamp)
+            if len(timestamps) >= count:
+                break
+    if len(timestamps) < 2:
+        return None
+    period = float(np.median(np.diff(timestamps)))
+    return 1e9 / period if period > 0 else None
+
+
+class ReplayEngine:
+    """
+    Feeds a recording into a driver at speed times real time (1.0 = real time,
+    None = as fast as possible). Sentences that fall due together are
+    dispatched as one chunk with the timestamp of the last, like a socket read.
+    Annotations are marked in the driver's recording and go to
+    on_annotation(timestamp, text).
+    """
+
+    def __init__(self, driver, path, speed=1.0, chunk_size=64, on_annotation=None):
+        self.driver = driver
+        self.path = path
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.on_annotation = on_annotation
+
+        self.sentences = 0
+        self.annotations = 0
+        self.elapsed = 0.0
+        self.finished = False
+
+    def run(self):
+        driver = self.driver
+        started = time.perf_counter()
+        first = None
+        chunk, chunk_time = [], 0
+
+        for timestamp, line in openReplaySource(self.path):
+            if not driver.running:
+                break
+            if not line.startswith("$MDA3"):
+                if chunk:
+                    driver.dispatchLines(chunk, chunk_time)
+                    chunk = []
+                self.annotations += 1
+                if driver.recording and driver.recorder:
+                    gap = GAP_PATTERN.match(line)
+                    driver.recorder.mark(Marker(timestamp, line, int(gap.group(1)) if gap else 0))
+                if self.on_annotation:
+                    self.on_annotation(timestamp, line)
+                continue
+
+            if self.speed:
+                if first is None:
+                    first = timestamp
+                due = started + (timestamp - first) / 1e9 / self.speed
+                wait = due - time.perf_counter()
+                if wait > 0:
+                    if chunk:
+                        driver.dispatchLines(chunk, chunk_time)
+                        chunk = []
+                    time.sleep(wait)
+
+            chunk.append(line)
+            chunk_time = timestamp
+            self.sentences += 1
+            if len(chunk) >= self.chunk_size:
+                driver.dispatchLines(chunk, chunk_time)
+                chunk = []
+
+        if chunk:
+            driver.dispatchLines(chunk, chunk_time)
+        self.elapsed = time.perf_counter() - started
+        self.finished = True
+
+
+if __name__ == "__main__":
+    from ceiaSensorDriver import CEIACWDDW_Driver
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("recording")
+    parser.add_argument("--speed", type=float, default=1.0, help="multiple of real time, 0 for as fast as possible")
+    parser.add_argument("--record", default=None, help="record the replayed samples to this file")
+    parser.add_argument("--spikes", action="store_true", help="run spike detection and print the events")
+    parser.add_argument("--prominence", type=float, default=150)
+    parser.add_argument("--plot", action="store_true", help="show the live plot")
+    args = parser.parse_args()
+
+    driver = CEIACWDDW_Driver()
+    if args.record:
+        driver.startRecording(args.record)
+    if args.spikes:
+        driver.startSpikeDetection(prominence=args.prominence, callback=print)
+    engine = driver.startReplay(args.recording, speed=args.speed or None,
+                                on_annotation=lambda timestamp, text: print(f"Annotation: {text}"))
+    if args.plot:
+        driver.startLivePlot()
+    driver.listener_thread.join()
+    driver.stopDataListener()
+    driver.stopRecording()
+    print(f"Replayed {engine.sentences} sentences in {engine.elapsed:.2f} s "
+          f"({engine.sentences / max(engine.elapsed, 1e-9):.0f} sentences/s), {engine.annotations} annotations")
+    driver.printStats()
@@ -0,0 +1,240 @@
+"""
+Rotating, optionally compressed recordings for long missions.
+
+A session is a series of segment files plus a JSON manifest next to them:
+
+    dive_0000.csv.gz, dive_0001.csv.gz, ...   segments, each a complete CSV or .mda3 file
+    dive.csv.manifest.json                    format, compression and one entry per segment
+
+A new segment starts when the current one reaches max_bytes on disk or has
+been open for max_seconds. Compression ("gzip", or "zstd" if the zstandard
+package is installed) happens in RotatingSink.write, which the
+RecordingWriter calls on its own thread, never on the acquisition thread.
+The manifest is rewritten atomically at every rotation, so it is valid
+whenever the recording is interrupted.
+
+    session = SessionReader("dive.csv.manifest.json")
+    records = session.records()
+"""
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from binaryRecording import BINARY_EXTENSION, HEADER, RECORD_DTYPE, BinarySink, recordsToCsv, rowToRecord
+from journalRecording import JOURNAL_EXTENSION
+from recordingWriter import CSV_HEADER, CsvSink
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+COMPRESSION_EXTENSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+MANIFEST_EXTENSION = ".manifest.json"
+
+
+def splitRecordingName(filename):
+    """Returns (base, format extension) for e.g. "dive.csv" or "dive.mda3"."""
+    base, extension = os.path.splitext(filename)
+    if extension == JOURNAL_EXTENSION:
+        # The journal is crash-safe on its own; rotated or compressed segments would lose that.
+        raise ValueError(f"{filename}: journal recordings cannot be rotated or compressed")
+    if extension not in (".csv", BINARY_EXTENSION):
+        base, extension = filename, ".csv"
+    return base, extension
+
+
+def openCompressed(path, compression, mode):
+    """Opens path as a binary stream, compressing on write or decompressing on read."""
+    if compression is None:
+        return open(path, mode + "b")
+    if compression == "gzip":
+        return gzip.open(path, mode + "b", compresslevel=6)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        raw = open(path, mode + "b")
+        if mode == "w":
+            return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+        return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+    raise ValueError(f"Unknown compression {compression!r}")
+
+
+class RotatingSink:
+    """Sink for RecordingWriter that writes a session of rotated, optionally compressed segments."""
+
+    def __init__(self, filename, header=CSV_HEADER, max_bytes=None, max_seconds=None, compression=None):
+        if compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Unknown compression {compression!r}")
+        if compression == "zstd" and zstandard is None:
+            raise ImportError("zstd compression needs the zstandard package")
+        self.base, self.extension = splitRecordingName(filename)
+        self.filename = self.base + self.extension + MANIFEST_EXTENSION  # A .csv and a .mda3 session can share a base
+        self.header = header
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.compression = compression
+
+        self.manifest = {
+            "format": self.extension.lstrip("."),
+            "compression": compression,
+            "header": list(header),
+            "created_ns": time.time_ns(),
+            "segments": [],
+        }
+        self.sink = None
+        self.stream = None
+        self.segment = None
+        self.opened = 0.0
+        self.openSegment()
+
+    def openSegment(self):
+        index = len(self.manifest["segments"])
+        path = f"{self.base}_{index:04d}{self.extension}{COMPRESSION_EXTENSIONS[self.compression]}"
+        self.stream = openCompressed(path, self.compression, "w")
+        if self.extension == BINARY_EXTENSION:
+            self.sink = BinarySink(path, file=self.stream)
+        else:
+            self.sink = CsvSink(path, self.header, file=io.TextIOWrapper(self.stream, newline='', write_through=True))
+        self.segment = {"file": os.path.basename(path), "start_ns": None, "end_ns": None, "samples": 0, "bytes": 0, "closed": False}
+        self.manifest["segments"].append(self.segment)
+        self.opened = time.monotonic()
+        self.writeManifest()
+
+    def closeSegment(self):
+        self.sink.flush()
+        self.sink.close()
+        path = os.path.join(os.path.dirname(self.filename), self.segment["file"])
+        self.segment["bytes"] = os.path.getsize(path)
+        self.segment["closed"] = True
+        self.writeManifest()
+
+    def writeManifest(self):
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(temporary, self.filename)
+
+    def segmentBytes(self):
+        """Bytes of the current segment on disk so far."""
+        path = os.path.join(os.path.dirname(self.filename), self.segment["file"])
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def write(self, samples):
+        self.sink.write(samples)
+        segment = self.segment
+        if segment["start_ns"] is None:
+            segment["start_ns"] = samples[0].Timestamp
+        segment["end_ns"] = samples[-1].Timestamp
+        segment["samples"] += len(samples)
+
+        if ((self.max_seconds is not None and time.monotonic() - self.opened >= self.max_seconds)
+                or (self.max_bytes is not None and self.segmentBytes() >= self.max_bytes)):
+            self.closeSegment()
+            self.openSegment()
+
+    def writeMarker(self, marker):
+        self.sink.writeMarker(marker)
+
+    def flush(self):
+        # For compressed segments this also flushes the compressor, so everything so far is readable.
+        self.sink.flush()
+
+    def sync(self):
+        try:
+            os.fsync(self.stream.fileno())
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            pass
+
+    def close(self):
+        self.closeSegment()
+
+
+class SessionReader:
+    """Reads a rotated session (given its manifest, or a single recording) as one continuous stream."""
+
+    def __init__(self, filename):
+        if filename.endswith(MANIFEST_EXTENSION):
+            with open(filename) as file:
+                self.manifest = json.load(file)
+            directory = os.path.dirname(filename)
+            self.paths = [os.path.join(directory, segment["file"]) for segment in self.manifest["segments"]]
+        else:
+            name, suffix = os.path.splitext(filename)
+            compression = {".gz": "gzip", ".zst": "zstd"}.get(suffix)
+            base, extension = splitRecordingName(name if compression else filename)
+            self.manifest = {"format": extension.lstrip("."), "compression": compression, "header": CSV_HEADER}
+            self.paths = [filename]
+        self.binary = "." + self.manifest["format"] == BINARY_EXTENSION
+        self.compression = self.manifest["compression"]
+        self.header = self.manifest["header"]
+
+    def rows(self):
+        """Yields the CSV rows of all segments in order, without the per-segment headers."""
+        if self.binary:
+            raise ValueError("rows() is for CSV sessions, use records()")
+        for path in self.paths:
+            with openCompressed(path, self.compression, "r") as stream:
+                reader = csv.reader(io.TextIOWrapper(stream, newline=''))
+                next(reader, None)
+                yield from reader
+
+    def records(self):
+        """
+        Returns all samples as one RECORD_DTYPE array. Annotation rows of CSV
+        sessions are skipped; binary marker records are kept (FLAGS).
+        """
+        if not self.binary:
+            rows = []
+            for row in self.rows():
+                try:
+                    rows.append(rowToRecord(row))
+                except (ValueError, KeyError, IndexError):
+                    pass
+            return np.array(rows, dtype=RECORD_DTYPE)
+
+        parts = []
+        for path in self.paths:
+            with openCompressed(path, self.compression, "r") as stream:
+                data = stream.read()
+            data = data[HEADER.size:]
+            usable = len(data) - len(data) % RECORD_DTYPE.itemsize  # A torn last record is ignored
+            parts.append(np.frombuffer(data[:usable], dtype=RECORD_DTYPE))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=RECORD_DTYPE)
+
+
+if __name__ == "__main__":
+    # Joins a rotated session into one uncompressed recording.
+    if len(sys.argv) != 3:
+        print(f"Usage: python {os.path.basename(__file__)} <session{MANIFEST_EXTENSION}> <output.csv|output{BINARY_EXTENSION}>")
+        sys.exit(1)
+
+    session = SessionReader(sys.argv[1])
+    target = sys.argv[2]
+    if target.endswith(BINARY_EXTENSION):
+        records = session.records()
+        sink = BinarySink(target)
+        sink.writeRecords(records)
+        sink.close()
+        print(f"{len(records)} records written to {target}")
+    elif session.binary:
+        print(f"{recordsToCsv(session.records(), target, session.header)} samples written to {target}")
+    else:
+        count = 0
+        with open(target, mode='w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(session.header)
+            for row in session.rows():
+                writer.writerow(row)
+                count += 1
+        print(f"{count} rows written to {target}")
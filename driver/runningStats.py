@@ -0,0 +1,143 @@
+import threading
+from collections import deque
+
+
+class RunningStats:
+    """Count, mean, variance, min and max of everything seen so far (Welford), O(1) per value."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "mean": self.mean if self.count else None,
+            "variance": self.m2 / (self.count - 1) if self.count > 1 else None,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class WindowStats:
+    """
+    Count, mean, variance, min and max over the last window_ns of integer values.
+
+    Sums are kept as Python ints so adding and removing values never drifts.
+    Min and max come from monotonic deques, so every value is added and
+    removed once and a query is O(1).
+    """
+
+    def __init__(self, window_ns):
+        self.window_ns = window_ns
+        self.reset()
+
+    def reset(self):
+        self.values = deque()  # (timestamp, value)
+        self.total = 0
+        self.total_squares = 0
+        self.min_queue = deque()  # Increasing values, candidates for the minimum
+        self.max_queue = deque()  # Decreasing values, candidates for the maximum
+
+    def update(self, timestamp, value):
+        self.values.append((timestamp, value))
+        self.total += value
+        self.total_squares += value * value
+        while self.min_queue and self.min_queue[-1][1] > value:
+            self.min_queue.pop()
+        self.min_queue.append((timestamp, value))
+        while self.max_queue and self.max_queue[-1][1] < value:
+            self.max_queue.pop()
+        self.max_queue.append((timestamp, value))
+        self.expire(timestamp)
+
+    def expire(self, now):
+        start = now - self.window_ns
+        values = self.values
+        while values and values[0][0] <= start:
+            _, old = values.popleft()
+            self.total -= old
+            self.total_squares -= old * old
+        while self.min_queue and self.min_queue[0][0] <= start:
+            self.min_queue.popleft()
+        while self.max_queue and self.max_queue[0][0] <= start:
+            self.max_queue.popleft()
+
+    def stats(self):
+        count = len(self.values)
+        return {
+            "count": count,
+            "mean": self.total / count if count else None,
+            "variance": (self.total_squares - self.total * self.total / count) / (count - 1) if count > 1 else None,
+            "min": self.min_queue[0][1] if self.min_queue else None,
+            "max": self.max_queue[0][1] if self.max_queue else None,
+        }
+
+
+class ChannelStats:
+    """
+    Session and sliding window statistics per channel, updated with every
+    batch of samples. Windows are in seconds and follow the sample timestamps;
+    a query with now_ns ends them at that time instead, so a stalled feed
+    does not keep reporting its last window.
+
+        stats.query()["RH1"]["10s"]["mean"]
+    """
+
+    def __init__(self, channels=("RH1", "RL1"), windows=(1, 10)):
+        self.channels = channels
+        self.windows = windows
+        self.session = {channel: RunningStats() for channel in channels}
+        self.sliding = {
+            channel: {f"{window:g}s": WindowStats(int(window * 1e9)) for window in windows}
+            for channel in channels
+        }
+        self.lock = threading.Lock()
+
+    def update(self, samples):
+        with self.lock:
+            for channel in self.channels:
+                session = self.session[channel]
+                sliding = self.sliding[channel].values()
+                for sample in samples:
+                    value = getattr(sample, channel)
+                    session.update(value)
+                    for window in sliding:
+                        window.update(sample.Timestamp, value)
+
+    def query(self, channel=None, now_ns=None):
+        """Returns {channel: {"session": {...}, "10s": {...}, ...}}, or the dict of one channel."""
+        with self.lock:
+            if now_ns is not None:
+                for name in ([channel] if channel else self.channels):
+                    for window in self.sliding[name].values():
+                        window.expire(now_ns)
+            result = {
+                name: {"session": self.session[name].stats(),
+                       **{label: window.stats() for label, window in self.sliding[name].items()}}
+                for name in ([channel] if channel else self.channels)
+            }
+        return result[channel] if channel else result
+
+    def reset(self):
+        with self.lock:
+            for channel in self.channels:
+                self.session[channel].reset()
+                for window in self.sliding[channel].values():
+                    window.reset()
@@ -0,0 +1,383 @@
+"""
+Local re-publishing of the driver's parsed samples over TCP or UDP, so
+loggers and dashboards share the one sensor connection.
+
+Every frame is a 16 byte header followed by count records:
+
+    header   magic "CEIF", count (u32), sequence of the first record (u64), little endian
+    records  count x binaryRecording.RECORD_DTYPE (32 bytes each)
+
+Sequence numbers count every record published, so a consumer sees any gap.
+A consumer subscribes by sending one request line, over TCP after
+connecting or as a datagram to the UDP port:
+
+    SUB             live samples only
+    SUB -30         everything from 30 s ago on (within the retention window)
+    SUB @<ns>       everything from that timestamp on
+
+UDP subscribers repeat the request at least every UDP_EXPIRY seconds to
+stay subscribed; a repeat does not replay again. TCP subscribers that
+fall more than max_client_buffer bytes behind are disconnected.
+"""
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from binaryRecording import RECORD_DTYPE, samplesToRecords
+
+
+FRAME_MAGIC = b"CEIF"
+FRAME_HEADER = struct.Struct("<4sIQ")
+UDP_MAX_RECORDS = 40  # 16 + 40 * 32 bytes, fits an Ethernet MTU
+UDP_EXPIRY = 10.0
+
+
+def encodeFrame(records, sequence):
+    return FRAME_HEADER.pack(FRAME_MAGIC, len(records), sequence) + records.tobytes()
+
+
+def parseRequest(line, now_ns):
+    """Returns the start timestamp in ns for a SUB request, None for live only. Raises ValueError if malformed."""
+    parts = line.strip().split()
+    if not parts or parts[0].upper() != "SUB":
+        raise ValueError(f"bad request {line!r}")
+    if len(parts) == 1:
+        return None
+    if parts[1].startswith("@"):
+        return int(parts[1][1:])
+    return now_ns + int(float(parts[1]) * 1e9)
+
+
+class TcpSubscriber:
+
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.request = b""
+        self.subscribed = False
+        self.outbuf = bytearray()
+
+
+class SamplePublisher:
+    """
+    Serves the samples passed to publish() on a local TCP port and
+    optionally a UDP port, keeping the last retention_seconds for replay.
+    All socket work happens on the publisher's own thread.
+    """
+
+    def __init__(self, host="127.0.0.1", port=5023, udp_port=None, retention_seconds=60, max_client_buffer=4 * 1024 * 1024):
+        self.host = host
+        self.port = port
+        self.udp_port = udp_port
+        self.retention_ns = int(retention_seconds * 1e9)
+        self.max_client_buffer = max_client_buffer
+
+        self.retention = deque()  # (first sequence, records), oldest first
+        self.sequence = 0
+        self.incoming = deque()  # Batches from publish(), taken over by the server thread
+        self.tcp_clients = {}
+        self.udp_clients = {}  # address -> expiry time
+
+        self.selector = None
+        self.server = None
+        self.udp = None
+        self.wake_read, self.wake_write = None, None
+        self.thread = None
+        self.running = False
+
+        # Stats
+        self.published = 0
+        self.frames_sent = 0
+        self.disconnected_slow = 0
+
+    def start(self):
+        """Binds the endpoints and starts serving. With port=0 the chosen port is in self.port."""
+        self.selector = selectors.DefaultSelector()
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(8)
+        self.server.setblocking(False)
+        self.port = self.server.getsockname()[1]
+        self.selector.register(self.server, selectors.EVENT_READ, "accept")
+
+        if self.udp_port is not None:
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.bind((self.host, self.udp_port))
+            self.udp.setblocking(False)
+            self.udp_port = self.udp.getsockname()[1]
+            self.selector.register(self.udp, selectors.EVENT_READ, "udp")
+
+        # publish() wakes the server thread through this pair.
+        self.wake_read, self.wake_write = socket.socketpair()
+        self.wake_read.setblocking(False)
+        self.wake_write.setblocking(False)
+        self.selector.register(self.wake_read, selectors.EVENT_READ, "wake")
+
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def publish(self, samples):
+        """Hands a batch of MDA3Samples to the server thread. Never blocks."""
+        if samples:
+            self.publishRecords(samplesToRecords(samples))
+
+    def publishRecords(self, records):
+        if not self.running or len(records) == 0:
+            return
+        self.incoming.append(records)
+        try:
+            self.wake_write.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Already woken
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            try:
+                self.wake_write.send(b"\0")
+            except OSError:
+                pass
+            self.thread.join()
+        for client in list(self.tcp_clients.values()):
+            self.dropClient(client)
+        for sock in (self.server, self.udp, self.wake_read, self.wake_write):
+            if sock:
+                sock.close()
+        self.selector.close()
+
+    def run(self):
+        while self.running:
+            for key, events in self.selector.select(timeout=1.0):
+                if key.data == "accept":
+                    self.accept()
+                elif key.data == "wake":
+                    try:
+                        while self.wake_read.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif key.data == "udp":
+                    self.readUdp()
+                else:
+                    client = key.data
+                    if events & selectors.EVENT_READ:
+                        self.readRequest(client)
+                    if events & selectors.EVENT_WRITE and client.sock in self.tcp_clients:
+                        self.flush(client)
+            self.distribute()
+
+    def accept(self):
+        try:
+            sock, address = self.server.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = TcpSubscriber(sock, address)
+        self.tcp_clients[sock] = client
+        self.selector.register(sock, selectors.EVENT_READ, client)
+
+    def readRequest(self, client):
+        try:
+            data = client.sock.recv(256)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.dropClient(client)
+            return
+        if client.subscribed:
+            return  # Nothing else is expected from a subscriber
+        client.request += data
+        if b"\n" not in client.request:
+            if len(client.request) > 256:
+                self.dropClient(client)
+            return
+        line = client.request.split(b"\n", 1)[0].decode(errors="replace")
+        try:
+            since = parseRequest(line, time.time_ns())
+        except ValueError as e:
+            print(f"ERROR Publisher {client.address}: {e}")
+            self.dropClient(client)
+            return
+        client.subscribed = True
+        for sequence, records in self.backlog(since):
+            client.outbuf += encodeFrame(records, sequence)
+        self.flush(client)
+
+    def readUdp(self):
+        while True:
+            try:
+                data, address = self.udp.recvfrom(256)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            try:
+                since = parseRequest(data.decode(errors="replace"), time.time_ns())
+            except ValueError:
+                continue
+            known = address in self.udp_clients
+            self.udp_clients[address] = time.monotonic() + UDP_EXPIRY
+            if not known:
+                for sequence, records in self.backlog(since):
+                    self.sendUdp(address, records, sequence)
+
+    def backlog(self, since):
+        """Retained (sequence, records) from timestamp since on, nothing for None."""
+        if since is None:
+            return
+        for sequence, records in self.retention:
+            timestamps = records["Timestamp"]
+            if timestamps[-1] < since:
+                continue
+            start = int(np.searchsorted(timestamps, since, side="left"))
+            yield sequence + start, records[start:]
+
+    def distribute(self):
+        """Moves new batches into the retention window and sends them to every subscriber."""
+        while self.incoming:
+            records = self.incoming.popleft()
+            sequence = self.sequence
+            self.sequence += len(records)
+            self.published += len(records)
+
+            self.retention.append((sequence, records))
+            newest = records["Timestamp"][-1]
+            while self.retention and self.retention[0][1]["Timestamp"][-1] < newest - self.retention_ns:
+                self.retention.popleft()
+
+            if self.tcp_clients:
+                frame = encodeFrame(records, sequence)
+                for client in list(self.tcp_clients.values()):
+                    if client.subscribed:
+                        client.outbuf += frame
+                        self.flush(client)
+            if self.udp_clients:
+                now = time.monotonic()
+                for address, expiry in list(self.udp_clients.items()):
+                    if expiry < now:
+                        del self.udp_clients[address]
+                    else:
+                        self.sendUdp(address, records, sequence)
+
+    def sendUdp(self, address, records, sequence):
+        for start in range(0, len(records), UDP_MAX_RECORDS):
+            try:
+                self.udp.sendto(encodeFrame(records[start:start + UDP_MAX_RECORDS], sequence + start), address)
+                self.frames_sent += 1
+            except OSError:
+                # Datagrams are best effort, the consumer sees the gap in the sequence.
+                pass
+
+    def flush(self, client):
+        if client.outbuf:
+            try:
+                sent = client.sock.send(client.outbuf)
+                del client.outbuf[:sent]
+                self.frames_sent += 1
+            except (BlockingIOError, InterruptedError):
+                pass
+            except OSError:
+                self.dropClient(client)
+                return
+        if len(client.outbuf) > self.max_client_buffer:
+            print(f"ERROR Publisher: {client.address} too slow, disconnected")
+            self.disconnected_slow += 1
+            self.dropClient(client)
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if client.outbuf else 0)
+        self.selector.modify(client.sock, events, client)
+
+    def dropClient(self, client):
+        if self.tcp_clients.pop(client.sock, None) is None:
+            return
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+
+    def stats(self):
+        return {
+            "tcp_subscribers": sum(client.subscribed for client in self.tcp_clients.values()),
+            "udp_subscribers": len(self.udp_clients),
+            "published": self.published,
+            "frames_sent": self.frames_sent,
+            "retained": sum(len(records) for _, records in self.retention),
+            "disconnected_slow": self.disconnected_slow,
+        }
+
+
+class SampleFeedClient:
+    """
+    Consumer side. since is None for live samples, a negative number of
+    seconds or an absolute timestamp in ns to replay from the retention window.
+
+        client = SampleFeedClient(port=5023, since=-30)
+        records, missed = client.read()
+    """
+
+    def __init__(self, host="127.0.0.1", port=5023, since=None, udp=False, timeout=5.0):
+        self.address = (host, port)
+        self.udp = udp
+        if since is None:
+            self.request = b"SUB\n"
+        elif since > 1e15:
+            self.request = f"SUB @{int(since)}\n".encode()
+        else:
+            self.request = f"SUB {since}\n".encode()
+        self.expected = None
+        self.missed = 0
+
+        if udp:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.settimeout(timeout)
+            self.sock.sendto(self.request, self.address)
+            self.last_request = time.monotonic()
+        else:
+            self.sock = socket.create_connection(self.address, timeout=timeout)
+            self.sock.sendall(self.request)
+
+    def read(self):
+        """Returns (records, missed) for the next frame; missed counts records skipped by a sequence gap."""
+        if self.udp:
+            if time.monotonic() - self.last_request > UDP_EXPIRY / 3:
+                self.sock.sendto(b"SUB\n", self.address)
+                self.last_request = time.monotonic()
+            data = self.sock.recv(65536)
+            magic, count, sequence = FRAME_HEADER.unpack_from(data)
+            payload = data[FRAME_HEADER.size:FRAME_HEADER.size + count * RECORD_DTYPE.itemsize]
+        else:
+            magic, count, sequence = FRAME_HEADER.unpack(self.receive(FRAME_HEADER.size))
+            payload = self.receive(count * RECORD_DTYPE.itemsize)
+        if magic != FRAME_MAGIC:
+            raise ValueError("Not a sample feed frame")
+
+        missed = 0
+        if self.expected is not None and sequence > self.expected:
+            missed = sequence - self.expected
+            self.missed += missed
+        self.expected = sequence + count
+        return np.frombuffer(payload, dtype=RECORD_DTYPE), missed
+
+    def receive(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Publisher closed the connection")
+            data += chunk
+        return bytes(data)
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,100 @@
+import threading
+
+import numpy as np
+
+
+SAMPLE_DTYPE = np.dtype([
+    ("Timestamp", "i8"),  # ns since the epoch
+    ("RH1", "i4"),
+    ("RH1R", "i4"),
+    ("RL1", "i4"),
+    ("RL1R", "i4"),
+    ("TYPE", "U2"),
+    ("DIS", "i4"),
+    ("DIM", "U1"),
+])
+
+
+class SampleRingBuffer:
+    """
+    Fixed capacity ring buffer of parsed samples in a NumPy structured array.
+
+    Every sample is written twice, at i and i + capacity, so the most recent
+    samples are always one contiguous slice and can be returned as a view
+    without copying. Views are live: they are overwritten once the writer has
+    gone around the ring, copy them if they need to be kept.
+    """
+
+    def __init__(self, capacity=200000):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=SAMPLE_DTYPE)
+        self.count = 0  # Samples written since creation or the last clear()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    @property
+    def overflow(self):
+        """Number of samples that have been overwritten."""
+        return max(0, self.count - self.capacity)
+
+    def append(self, sample):
+        self.extend((sample,))
+
+    def extend(self, samples):
+        """Writes a batch of MDA3Sample records (or tuples in SAMPLE_DTYPE order)."""
+        k = len(samples)
+        if k == 0:
+            return
+        rows = np.array([tuple(sample[:8]) for sample in samples], dtype=SAMPLE_DTYPE)
+        capacity = self.capacity
+
+        with self.lock:
+            if k > capacity:
+                self.count += k - capacity
+                rows = rows[-capacity:]
+                k = capacity
+
+            pos = self.count % capacity
+            first = min(k, capacity - pos)
+            self.data[pos:pos + first] = rows[:first]
+            self.data[pos + capacity:pos + capacity + first] = rows[:first]
+            rest = k - first
+            if rest:
+                self.data[:rest] = rows[first:]
+                self.data[capacity:capacity + rest] = rows[first:]
+            self.count += k
+
+    def last(self, n=None):
+        """Zero-copy view of the last n samples (all buffered samples if n is None)."""
+        size = len(self)
+        if n is None or n > size:
+            n = size
+        end = self.count % self.capacity + self.capacity
+        return self.data[end - n:end]
+
+    def lastSeconds(self, seconds):
+        """Zero-copy view of the samples from the last `seconds` before the newest sample."""
+        view = self.last()
+        if len(view) == 0:
+            return view
+        timestamps = view["Timestamp"]
+        start = np.searchsorted(timestamps, timestamps[-1] - int(seconds * 1e9), side="left")
+        return view[start:]
+
+    def snapshot(self, last_n=None, last_seconds=None, fields=None):
+        """
+        Copy of the last n samples or last_seconds, taken under the writer lock so
+        it is consistent even while the listener keeps writing. fields limits the
+        copy to some columns, e.g. ("Timestamp", "RH1", "RL1").
+        """
+        with self.lock:
+            view = self.lastSeconds(last_seconds) if last_seconds is not None else self.last(last_n)
+            if fields is not None:
+                view = view[list(fields)]
+            return view.copy()
+
+    def clear(self):
+        with self.lock:
+            self.count = 0
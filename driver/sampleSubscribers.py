@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+
+# Backpressure policies, what publish() does when a subscriber's queue is full
+POLICY_BLOCK = "block"              # Wait for room, the socket reader stalls with the subscriber
+POLICY_DROP_OLDEST = "drop_oldest"  # Discard the oldest queued samples, the subscriber skips ahead
+POLICY_DROP_NEWEST = "drop_newest"  # Discard the incoming samples, the subscriber keeps its backlog
+POLICIES = (POLICY_BLOCK, POLICY_DROP_OLDEST, POLICY_DROP_NEWEST)
+
+
+class Subscription:
+    """
+    Delivers samples to one consumer on its own thread through a bounded queue.
+
+    publish() is called on the acquisition thread and only appends to the
+    queue, so a slow consumer can only delay the reader under POLICY_BLOCK.
+    With batch=True the callback receives a list of up to max_batch samples
+    per call, otherwise one MDA3Sample per call.
+    """
+
+    def __init__(self, callback, queue_size=1000, policy=POLICY_DROP_OLDEST, batch=False, max_batch=1000, name=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}, expected one of {POLICIES}")
+        self.callback = callback
+        self.queue_size = queue_size
+        self.policy = policy
+        self.batch = batch
+        self.max_batch = max_batch
+        self.name = name or getattr(callback, "__name__", "subscriber")
+
+        # Entries are (sample, publish time in monotonic ns)
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # Stats
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.queue_high_water = 0
+        self.blocked_time = 0.0
+        self.lag_total = 0
+        self.lag_max = 0
+        self.callback_time_total = 0.0
+        self.callback_time_max = 0.0
+        self.callback_errors = 0
+
+        self.thread = threading.Thread(target=self.run, name=f"subscriber-{self.name}", daemon=True)
+        self.thread.start()
+
+    def publish(self, samples):
+        """Queues samples according to the policy. Returns the number dropped."""
+        if not samples or self.closed:
+            return 0
+        now = time.monotonic_ns()
+        dropped = 0
+        with self.condition:
+            self.published += len(samples)
+            if self.policy == POLICY_BLOCK:
+                start = time.perf_counter()
+                for sample in samples:
+                    while len(self.queue) >= self.queue_size and not self.closed:
+                        self.condition.wait()
+                    self.queue.append((sample, now))
+                    self.condition.notify_all()
+                self.blocked_time += time.perf_counter() - start
+            else:
+                room = self.queue_size - len(self.queue)
+                if self.policy == POLICY_DROP_NEWEST and len(samples) > room:
+                    dropped = len(samples) - max(room, 0)
+                    samples = samples[:max(room, 0)]
+                self.queue.extend((sample, now) for sample in samples)
+                while len(self.queue) > self.queue_size:
+                    self.queue.popleft()
+                    dropped += 1
+                self.condition.notify_all()
+            self.dropped += dropped
+            self.queue_high_water = max(self.queue_high_water, len(self.queue))
+        return dropped
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                if not self.queue:
+                    return
+                count = min(len(self.queue), self.max_batch if self.batch else 1)
+                entries = [self.queue.popleft() for _ in range(count)]
+                self.condition.notify_all()
+
+            start = time.perf_counter()
+            try:
+                if self.batch:
+                    self.callback([sample for sample, _ in entries])
+                else:
+                    self.callback(entries[0][0])
+            except Exception as e:
+                self.callback_errors += 1
+                print(f"ERROR Subscriber {self.name}: {e}")
+            elapsed = time.perf_counter() - start
+            self.callback_time_total += elapsed
+            self.callback_time_max = max(self.callback_time_max, elapsed)
+
+            now = time.monotonic_ns()
+            self.delivered += len(entries)
+            for _, published in entries:
+                lag = now - published
+                self.lag_total += lag
+                if lag > self.lag_max:
+                    self.lag_max = lag
+
+    def close(self, drain=True):
+        """Stops the delivery thread, after delivering what is queued unless drain is False."""
+        with self.condition:
+            self.closed = True
+            if not drain:
+                self.dropped += len(self.queue)
+                self.queue.clear()
+            self.condition.notify_all()
+        if threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "queue_depth": len(self.queue),
+            "queue_high_water": self.queue_high_water,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "blocked_time": self.blocked_time,
+            "lag_mean": self.lag_total / self.delivered / 1e9 if self.delivered else 0.0,
+            "lag_max": self.lag_max / 1e9,
+            "callback_time_mean": self.callback_time_total / self.delivered if self.delivered else 0.0,
+            "callback_time_max": self.callback_time_max,
+            "callback_errors": self.callback_errors,
+        }
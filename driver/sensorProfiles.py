@@ -0,0 +1,43 @@
+"""
+Named sensor configuration profiles for CEIACWDDW_Driver.applyProfile().
+
+A profile is a dict of settings; only the keys present are sent, in the
+order of PROFILE_FIELDS. Water type is "FS" (fresh) or "SW" (salt).
+"""
+
+# Profile key and the command that sets it, in the order they are sent
+PROFILE_FIELDS = (
+    ("sensitivity", "SE"),
+    ("output_rate", "COR"),
+    ("water_type", "WTY"),
+    ("ip_address", "IPA"),
+    ("gateway", "GW"),
+    ("netmask", "MASK"),
+    ("server_port", "SPT"),
+)
+
+PROFILES = {
+    "default": {"sensitivity": 127, "output_rate": 10, "water_type": "FS"},
+    "lake": {"sensitivity": 127, "output_rate": 50, "water_type": "FS"},
+    "sea": {"sensitivity": 127, "output_rate": 50, "water_type": "SW"},
+    "highRate": {"sensitivity": 127, "output_rate": 100, "water_type": "FS"},
+    "network": {"ip_address": "192.168.1.202", "gateway": "192.168.1.1", "netmask": "255.255.255.0", "server_port": 23},
+}
+
+
+def profileCommands(profile):
+    """Returns the (query, data) commands for a profile dict."""
+    unknown = set(profile) - {key for key, _ in PROFILE_FIELDS}
+    if unknown:
+        raise ValueError(f"Unknown profile settings: {', '.join(sorted(unknown))}")
+    return [(query, str(profile[key])) for key, query in PROFILE_FIELDS if profile.get(key) is not None]
+
+
+def checkReply(query, data, reply):
+    """True if reply acknowledges query set to data: no error, and an echoed value must match."""
+    if reply is None or reply.strip().upper().startswith("ERR"):
+        return False
+    fields = reply.split()
+    if len(fields) >= 2 and fields[0].upper() == query:
+        return fields[-1] == data
+    return True
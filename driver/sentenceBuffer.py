@@ -0,0 +1,154 @@
+class SentenceBuffer:
+    """
+    Persistent receive buffer for the sensor's telnet stream.
+
+    Bytes are read with recv_into into one preallocated bytearray and only
+    complete sentences are decoded. A sentence that straddles two reads is
+    carried over to the next read instead of being dropped. The unterminated
+    ">" prompt is returned as its own token so command replies do not sit in
+    the buffer waiting for a terminator that never comes.
+    """
+
+    PROMPT = ">"
+
+    def __init__(self, size=4096):
+        self.size = size
+        self.buffer = bytearray(size)
+        self.view = memoryview(self.buffer)
+        self.start = 0
+        self.end = 0
+        self.carry = False
+
+        # Counters
+        self.bytes_received = 0
+        self.sentences = 0
+        self.partial_count = 0  # Sentences reassembled across reads
+        self.garbled_count = 0  # Undecodable, overlong or junk-prefixed lines
+
+    def fill(self, sock):
+        """Reads one block from the socket into the free space of the buffer."""
+        self.makeRoom()
+        nbytes = sock.recv_into(self.view[self.end:])
+        if nbytes == 0:
+            raise ConnectionError("Connection closed by sensor")
+        self.end += nbytes
+        self.bytes_received += nbytes
+        return nbytes
+
+    def feed(self, data):
+        """Appends bytes read elsewhere (e.g. an asyncio stream) and returns the complete lines."""
+        lines = []
+        data = memoryview(data)
+        while len(data):
+            self.makeRoom()
+            nbytes = min(len(data), self.size - self.end)
+            self.buffer[self.end:self.end + nbytes] = data[:nbytes]
+            self.end += nbytes
+            self.bytes_received += nbytes
+            data = data[nbytes:]
+            lines.extend(self.drain())
+        return lines
+
+    def readLines(self, sock):
+        """Reads one block from the socket and returns the complete lines it finished."""
+        self.fill(sock)
+        return self.drain()
+
+    def drain(self):
+        """Returns all complete lines in the buffer and keeps the trailing partial line."""
+        lines = []
+        buffer = self.buffer
+        pos = self.start
+        end = self.end
+
+        while pos < end:
+            cut = self.nextDelimiter(pos, end)
+            if cut < 0:
+                break
+            if cut > pos:
+                self.appendLine(lines, pos, cut)
+            if buffer[cut] == 0x3E:  # ">"
+                lines.append(self.PROMPT)
+            pos = cut + 1
+
+        self.start = pos
+        if self.start == self.end:
+            self.start = self.end = 0
+        self.carry = self.start < self.end
+        return lines
+
+    def nextDelimiter(self, pos, end):
+        """Index of the next CR, LF or prompt character, or -1."""
+        buffer = self.buffer
+        cut = -1
+        for delimiter in (0x0D, 0x0A, 0x3E):
+            index = buffer.find(delimiter, pos, end)
+            if index != -1 and (cut == -1 or index < cut):
+                cut = index
+                end = index
+        return cut
+
+    def appendLine(self, lines, pos, cut):
+        carried = self.carry and pos == self.start
+        self.carry = False
+        try:
+            line = self.buffer[pos:cut].decode("ascii").strip()
+        except UnicodeDecodeError:
+            self.garbled_count += 1
+            return
+        if not line:
+            return
+        if carried:
+            self.partial_count += 1
+        if line[0] != "$" and "$MDA3" in line:
+            # Junk in front of a sentence, e.g. the tail of a lost one.
+            self.garbled_count += 1
+            line = line[line.index("$MDA3"):]
+        if line.startswith("$MDA3"):
+            self.sentences += 1
+        lines.append(line)
+
+    def makeRoom(self):
+        """Moves the unconsumed tail to the front so the next read has space."""
+        if self.start:
+            remaining = self.end - self.start
+            self.buffer[:remaining] = self.buffer[self.start:self.end]
+            self.start = 0
+            self.end = remaining
+        if self.end == self.size:
+            # A full buffer without a terminator cannot hold a sentence.
+            self.garbled_count += 1
+            self.start = self.end = 0
+            self.carry = False
+
+    def clear(self):
+        self.start = self.end = 0
+        self.carry = False
+
+
+def takeReply(pending, reply):
+    """
+    Removes the commands a reply completes from pending, a deque of
+    (command name, future) oldest first, and returns (lost, answered).
+    A one line reply that echoes a pending command's name answers the oldest
+    such command and the commands before it lost their replies; anything
+    else answers the oldest pending command. A command that timed out so
+    does not hold up the ones after it.
+    """
+    if not pending:
+        return [], None
+    lines = reply.split("\n")
+    words = lines[0].split()
+    if len(lines) == 1 and words:
+        name = words[0].upper()
+        for i, (query, _) in enumerate(pending):
+            if query == name:
+                lost = [pending.popleft()[1] for _ in range(i)]
+                return lost, pending.popleft()[1]
+    return [], pending.popleft()[1]
+
+
+def commandName(query):
+    """The name a reply echoes, e.g. "WTY" for "WTY FS"."""
+    words = query.split()
+    return words[0].upper() if words else ""
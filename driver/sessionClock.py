@@ -0,0 +1,33 @@
+import time
+from datetime import datetime
+
+
+class SessionClock:
+    """
+    Wall clock time in integer ns, anchored once at session start and then
+    advanced with time.monotonic_ns(). Cheaper than datetime.now() and free
+    of NTP steps during a session.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.wall_anchor_ns = time.time_ns()
+        self.monotonic_anchor_ns = time.monotonic_ns()
+
+    def now(self):
+        return self.wall_anchor_ns + time.monotonic_ns() - self.monotonic_anchor_ns
+
+
+def isoTimestamp(timestamp_ns):
+    """Formats an integer ns timestamp as a local ISO 8601 string with microseconds."""
+    seconds, ns = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000).isoformat()
+
+
+def parseIsoTimestamp(text):
+    """Inverse of isoTimestamp."""
+    moment = datetime.fromisoformat(text)
+    seconds = int(moment.replace(microsecond=0).timestamp())
+    return seconds * 1_000_000_000 + moment.microsecond * 1000
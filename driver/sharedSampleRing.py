@@ -0,0 +1,197 @@
+"""
+Live sample feed for other local processes through multiprocessing.shared_memory.
+
+    header   64 bytes   magic "CEIARING", version, record size, capacity,
+                        write sequence, reserved sequence, writer pid
+    records  capacity slots of binaryRecording.RECORD_DTYPE
+
+The driver is the only writer. For each batch it first advances the
+reserved sequence, fills the slots and then advances the write sequence
+(total records written), so everything below the write sequence is
+complete and nothing below reserved - capacity is still valid. A reader
+keeps its own sequence and copies what is new. A reader that falls more
+than capacity records behind has been lapped; the records it missed are
+counted and it resumes at the oldest one still in the ring.
+
+    reader = SharedSampleReader("ceia_samples")
+    records, lapped = reader.read()
+"""
+import os
+import struct
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from binaryRecording import RECORD_DTYPE, FLAG_MARKER, samplesToRecords
+
+
+RING_MAGIC = b"CEIARING"
+RING_VERSION = 1
+RING_HEADER = struct.Struct("<8sIIQ")  # magic, version, record size, capacity
+RING_HEADER_SIZE = 64
+SEQUENCE_OFFSET = 32  # int64 write sequence and reserved sequence, 8 byte aligned
+OWNER = struct.Struct("<q")  # pid of the writer, after the sequences
+OWNER_OFFSET = 48
+
+
+def processAlive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def attachSharedMemory(name):
+    """Opens an existing block without letting this process's resource tracker unlink it at exit."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always registers the block, which would unlink it when a reader exits.
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedSampleRing:
+    """
+    Writer side, owned by the driver. Creates the shared memory block and
+    unlinks it on close(). A block of the same name left over by a writer
+    that did not shut down cleanly is replaced; one whose writer is still
+    running raises FileExistsError.
+    """
+
+    def __init__(self, name="ceia_samples", capacity=65536):
+        self.name = name
+        self.capacity = capacity
+        size = RING_HEADER_SIZE + capacity * RECORD_DTYPE.itemsize
+        try:
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = attachSharedMemory(name)
+            try:
+                magic = RING_HEADER.unpack_from(stale.buf, 0)[0] if stale.size >= RING_HEADER_SIZE else None
+                owner = OWNER.unpack_from(stale.buf, OWNER_OFFSET)[0] if magic == RING_MAGIC else 0
+            finally:
+                stale.close()
+            if magic != RING_MAGIC or (owner > 0 and processAlive(owner)):
+                raise FileExistsError(f"Shared memory {name} is in use by {'process ' + str(owner) if owner else 'something else'}")
+            # Left over from a driver that did not shut down cleanly. Attached tracked, so unlink also unregisters it.
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.block = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        RING_HEADER.pack_into(self.block.buf, 0, RING_MAGIC, RING_VERSION, RECORD_DTYPE.itemsize, capacity)
+        OWNER.pack_into(self.block.buf, OWNER_OFFSET, os.getpid())
+        self.sequence = np.ndarray((2,), dtype="<i8", buffer=self.block.buf, offset=SEQUENCE_OFFSET)
+        self.sequence[:] = 0
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=self.block.buf, offset=RING_HEADER_SIZE)
+
+    def publish(self, samples):
+        """Writes a batch of MDA3Samples, then makes them visible by advancing the sequence."""
+        if samples:
+            self.publishRecords(samplesToRecords(samples))
+
+    def publishRecords(self, records):
+        k = len(records)
+        if k == 0:
+            return
+        capacity = self.capacity
+        seq = int(self.sequence[0])
+        self.sequence[1] = seq + k
+        if k > capacity:
+            seq += k - capacity
+            records = records[-capacity:]
+            k = capacity
+        pos = seq % capacity
+        first = min(k, capacity - pos)
+        self.records[pos:pos + first] = records[:first]
+        if k > first:
+            self.records[:k - first] = records[first:]
+        self.sequence[0] = seq + k
+
+    def close(self):
+        # Drop the numpy views first, the block cannot be closed while they export its buffer.
+        self.sequence = self.records = None
+        self.block.close()
+        try:
+            self.block.unlink()
+        except FileNotFoundError:
+            pass  # Already removed by someone else
+
+
+class SharedSampleReader:
+    """Reader side, for any local process. Starts at the newest record unless from_start is set."""
+
+    def __init__(self, name="ceia_samples", from_start=False):
+        self.block = attachSharedMemory(name)
+        magic, version, record_size, capacity = RING_HEADER.unpack_from(self.block.buf, 0)
+        if magic != RING_MAGIC or version != RING_VERSION or record_size != RECORD_DTYPE.itemsize:
+            self.block.close()
+            raise ValueError(f"{name}: not a compatible sample ring")
+        self.capacity = capacity
+        self.sequence = np.ndarray((2,), dtype="<i8", buffer=self.block.buf, offset=SEQUENCE_OFFSET)
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=self.block.buf, offset=RING_HEADER_SIZE)
+
+        head = int(self.sequence[0])
+        self.next = max(0, head - capacity) if from_start else head
+        self.lapped = 0  # Records overwritten before this reader got to them
+
+    def available(self):
+        return int(self.sequence[0]) - self.next
+
+    def read(self, max_records=None):
+        """
+        Returns (records, lapped): a copy of the records written since the last
+        read, oldest first, and how many were lost to the writer this time.
+        """
+        head = int(self.sequence[0])
+        lapped = 0
+        if head - self.next > self.capacity:
+            lapped = head - self.capacity - self.next
+            self.next = head - self.capacity
+        end = head if max_records is None else min(head, self.next + max_records)
+
+        start = self.next
+        pos, n = start % self.capacity, end - start
+        first = min(n, self.capacity - pos)
+        if n > first:
+            records = np.concatenate((self.records[pos:], self.records[:n - first]))
+        else:
+            records = self.records[pos:pos + n].copy()
+
+        # The writer may have wrapped onto the oldest slots while they were copied.
+        overwritten = int(self.sequence[1]) - self.capacity - start
+        if overwritten > 0:
+            records = records[overwritten:]
+            lapped += min(overwritten, n)
+
+        self.next = end
+        self.lapped += lapped
+        return records, lapped
+
+    def close(self):
+        self.sequence = self.records = None
+        self.block.close()
+
+
+if __name__ == "__main__":
+    # Follows a running driver's feed and prints the rate once per second.
+    reader = SharedSampleReader(sys.argv[1] if len(sys.argv) > 1 else "ceia_samples")
+    try:
+        while True:
+            time.sleep(1)
+            records, lapped = reader.read()
+            samples = records[(records["FLAGS"] & FLAG_MARKER) == 0]
+            last = f", last RH1 {samples['RH1'][-1]} RL1 {samples['RL1'][-1]}" if len(samples) else ""
+            print(f"{len(samples)} samples/s, {lapped} lapped{last}")
+    except KeyboardInterrupt:
+        reader.close()
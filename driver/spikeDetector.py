@@ -0,0 +1,90 @@
+from collections import deque, namedtuple
+
+
+# One detected spike. Timestamp is the peak sample's (int ns), detected_at the sample that confirmed it.
+SpikeEvent = namedtuple("SpikeEvent", ["Timestamp", "channel", "value", "prominence", "detected_at"])
+
+
+class PeakTracker:
+    """
+    Streaming peak detector with hysteresis, constant state and cost per value.
+
+    Alternates between looking for a maximum and a minimum. A maximum is
+    confirmed as a peak once the signal has dropped prominence below it, and
+    only after it rose at least prominence above the preceding minimum. On
+    recorded data this finds the same peaks as the offline
+    scipy.signal.find_peaks(prominence=...), reported once the fall is seen.
+    """
+
+    def __init__(self, prominence=150):
+        self.prominence = prominence
+        self.reset()
+
+    def reset(self):
+        self.looking_for_max = True
+        self.max_value = float("-inf")
+        self.max_time = 0
+        self.min_value = float("inf")
+        self.base = float("inf")  # Minimum before the current maximum
+
+    def update(self, timestamp, value):
+        """Returns (peak time, peak value, rise above the preceding minimum) if value confirms a peak, else None."""
+        if self.looking_for_max:
+            if value > self.max_value:
+                self.max_value = value
+                self.max_time = timestamp
+            if value <= self.max_value - self.prominence and self.max_value - self.base >= self.prominence:
+                peak = (self.max_time, self.max_value, self.max_value - self.base)
+                self.looking_for_max = False
+                self.min_value = value
+                return peak
+            if value < self.base:
+                # Still falling towards the first minimum, no peak to confirm yet.
+                self.base = value
+                self.max_value = value
+                self.max_time = timestamp
+        else:
+            if value < self.min_value:
+                self.min_value = value
+            elif value >= self.min_value + self.prominence:
+                self.looking_for_max = True
+                self.base = self.min_value
+                self.max_value = value
+                self.max_time = timestamp
+        return None
+
+
+class SpikeDetector:
+    """
+    Runs a PeakTracker per channel over parsed samples and keeps the last
+    max_events SpikeEvents. callback(event) is called for every detection
+    on the thread that calls update().
+    """
+
+    def __init__(self, channels=("RH1", "RL1"), prominence=150, callback=None, max_events=1000):
+        self.channels = channels
+        self.trackers = {channel: PeakTracker(prominence) for channel in channels}
+        self.callback = callback
+        self.events = deque(maxlen=max_events)
+        self.detections = 0
+
+    def update(self, samples):
+        """Feeds a batch of MDA3Samples. Returns the events detected in it."""
+        events = []
+        for sample in samples:
+            for channel in self.channels:
+                peak = self.trackers[channel].update(sample.Timestamp, getattr(sample, channel))
+                if peak is not None:
+                    events.append(SpikeEvent(peak[0], channel, peak[1], peak[2], sample.Timestamp))
+        if events:
+            self.detections += len(events)
+            self.events.extend(events)
+            if self.callback:
+                for event in events:
+                    self.callback(event)
+        return events
+
+    def reset(self):
+        for tracker in self.trackers.values():
+            tracker.reset()
+        self.events.clear()
@@ -0,0 +1,184 @@
+"""
+End-to-end acquisition benchmark of CEIACWDDW_Driver against the local simulator.
+
+For every output rate the simulator runs in its own process with tagged
+samples, the driver connects, records to a temporary file and runs its normal
+listener for a fixed duration. Reported per rate:
+
+    samples_per_s          sustained parsed samples per second
+    stage_us_per_sample    CPU time spent in recv, decode, parse, record and callback
+                           (the callback runs on its subscriber thread)
+    latency_ms             send to callback latency percentiles (p50, p90, p99, max)
+    cpu_us_per_sample      process CPU time per sample
+    dropped                missing sequence numbers, parse and checksum failures
+
+Results are printed and written as JSON so runs can be compared:
+
+    python acquisitionBenchmark.py --rates 10 50 100 500 --duration 10 --output bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "driver"))
+
+from ceiaSensorDriver import CEIACWDDW_Driver
+from ceiaSensorSimulator import CEIASensorSimulator
+
+
+STAGES = ("recv", "decode", "parse", "record", "callback")
+
+
+def runSimulator(port_queue, stop_event, options):
+    simulator = CEIASensorSimulator(port=0, tag_samples=True, **options).start()
+    port_queue.put(simulator.port)
+    stop_event.wait()
+    simulator.stop()
+
+
+class StageTimer:
+    """Wraps a callable and accumulates the thread CPU time spent in it, so blocking in recv() is not counted."""
+
+    def __init__(self, function):
+        self.function = function
+        self.total = 0.0
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        start = time.thread_time()
+        try:
+            return self.function(*args, **kwargs)
+        finally:
+            self.total += time.thread_time() - start
+            self.calls += 1
+
+
+def benchmarkRate(rate, duration, record_format, simulator_options):
+    port_queue = multiprocessing.Queue()
+    stop_event = multiprocessing.Event()
+    process = multiprocessing.Process(target=runSimulator, args=(port_queue, stop_event, simulator_options), daemon=True)
+    process.start()
+    port = port_queue.get(timeout=10)
+
+    driver = CEIACWDDW_Driver(ip="127.0.0.1", port=port, buffer_capacity=max(1000, int(rate * duration * 2)))
+    if not driver.setupEthernet() or not driver.logIn():
+        stop_event.set()
+        process.join()
+        raise RuntimeError("Could not connect to the simulator")
+    driver.outputRate(rate)
+
+    record_dir = tempfile.mkdtemp(prefix="ceia_bench_")
+    driver.startRecording(os.path.join(record_dir, f"bench_{rate}Hz{record_format}"))
+
+    # Instrument the listener stages on this driver instance only.
+    timers = {
+        "recv": StageTimer(driver.rx.fill),
+        "decode": StageTimer(driver.rx.drain),
+        "parse": StageTimer(driver.parser.parseBatch),
+        "record": StageTimer(driver.recorder.submit),
+    }
+    driver.rx.fill = timers["recv"]
+    driver.rx.drain = timers["decode"]
+    driver.parser.parseBatch = timers["parse"]
+    driver.recorder.submit = timers["record"]
+
+    latencies_us = []
+    sequences = []
+
+    def onSample(sample):
+        now_us = time.monotonic_ns() // 1000 % 1_000_000_000
+        sequences.append(sample.RH1R)
+        latencies_us.append((now_us - sample.RL1R) % 1_000_000_000)
+
+    timers["callback"] = StageTimer(onSample)
+
+    driver.startContinuousOutput()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    driver.startDataListener(callback=timers["callback"])
+    time.sleep(duration)
+    driver.stopDataListener()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    driver.stopContinuousOutput()
+    driver.stopRecording()
+    driver.closeEthernet()
+    stop_event.set()
+    process.join()
+    shutil.rmtree(record_dir, ignore_errors=True)
+
+    samples = driver.parser.parsed
+    per_sample = max(samples, 1)
+    missing = 0
+    if sequences:
+        unique = np.unique(sequences)
+        missing = int(unique[-1] - unique[0] + 1 - len(unique))
+    latencies_ms = np.array(latencies_us) / 1000.0 if latencies_us else np.zeros(1)
+
+    return {
+        "rate_hz": rate,
+        "duration_s": round(wall, 3),
+        "samples": samples,
+        "samples_per_s": round(samples / wall, 2),
+        "stage_us_per_sample": {name: round(timers[name].total / per_sample * 1e6, 3) for name in STAGES},
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p90": round(float(np.percentile(latencies_ms, 90)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+            "max": round(float(latencies_ms.max()), 3),
+        },
+        "cpu_us_per_sample": round(cpu / per_sample * 1e6, 3),
+        "dropped": {
+            "missing_sequence": missing,
+            "parse_failures": driver.parser.parse_failures,
+            "checksum_failures": driver.parser.checksum_failures,
+            "garbled_lines": driver.rx.garbled_count,
+            "recorder_dropped": driver.recorder.dropped_samples if driver.recorder else 0,
+        },
+    }
+
+
+def runBenchmark(rates, duration, record_format=".mda3", simulator_options=None):
+    results = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "record_format": record_format,
+        "runs": [],
+    }
+    for rate in rates:
+        run = benchmarkRate(rate, duration, record_format, simulator_options or {})
+        results["runs"].append(run)
+        stages = " ".join(f"{name} {us:.1f}" for name, us in run["stage_us_per_sample"].items())
+        print(f"{rate:5d} Hz: {run['samples_per_s']:8.1f} samples/s, p50 {run['latency_ms']['p50']:.2f} ms, "
+              f"p99 {run['latency_ms']['p99']:.2f} ms, cpu {run['cpu_us_per_sample']:.1f} us/sample, "
+              f"missing {run['dropped']['missing_sequence']} | us/sample: {stages}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rates", type=int, nargs="+", default=[10, 50, 100, 250, 500, 1000])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per rate")
+    parser.add_argument("--format", default=".mda3", choices=[".mda3", ".csv"], help="recording format")
+    parser.add_argument("--split-probability", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="JSON result file")
+    args = parser.parse_args()
+
+    results = runBenchmark(args.rates, args.duration, args.format, {"split_probability": args.split_probability})
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,291 @@
+"""
+Local simulator of the CEIA CWD-DW telnet interface for hardware free testing.
+
+Emulates what CEIACWDDW_Driver sees of the sensor: one session at a time,
+PIN login, ">" prompt, the command set (SE, COR, STA, SC, PT, WTY, CO ON/OFF,
+RE, ...) and $MDA3 streaming at the configured output rate with valid
+checksums. Faults can be injected to exercise the acquisition path:
+
+    split_probability          sentence sent in two writes with a short pause
+    bad_checksum_probability   sentence sent with a wrong checksum
+    stall_probability          streaming pauses for stall_seconds
+    disconnect_after           session closed abruptly after that many seconds
+
+With tag_samples the RH1R field carries a sequence number and RL1R the send
+time (time.monotonic_ns() in us, modulo 1e9) so a benchmark can measure
+latency and dropped samples.
+
+    simulator = CEIASensorSimulator(port=0, split_probability=0.1)
+    simulator.start()
+    driver = CEIACWDDW_Driver(ip="127.0.0.1", port=simulator.port)
+"""
+import math
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "driver"))
+
+from mda3Parser import formatMDA3, nmeaChecksum
+
+
+class CEIASensorSimulator:
+
+    def __init__(self, host="127.0.0.1", port=2323, pin="050899", settle_seconds=2.0,
+                 split_probability=0.0, bad_checksum_probability=0.0,
+                 stall_probability=0.0, stall_seconds=0.5, disconnect_after=None,
+                 target_interval=None, tag_samples=False, seed=None):
+        self.host = host
+        self.port = port
+        self.pin = pin
+        self.settle_seconds = settle_seconds
+
+        # Fault injection
+        self.split_probability = split_probability
+        self.bad_checksum_probability = bad_checksum_probability
+        self.stall_probability = stall_probability
+        self.stall_seconds = stall_seconds
+        self.disconnect_after = disconnect_after
+
+        self.target_interval = target_interval  # Seconds between simulated metal passes, None for none
+        self.tag_samples = tag_samples
+        self.random = random.Random(seed)
+
+        self.server = None
+        self.accept_thread = None
+        self.running = False
+        self.session = None
+
+        # Sensor settings, survive reconnects like on the real unit
+        self.settings = {"SE": "127", "COR": "10", "WTY": "FS", "IPA": "192.168.1.202",
+                         "GW": "192.168.1.1", "MASK": "255.255.255.0", "SPT": "23"}
+        self.settling_until = 0.0
+
+        # Stats
+        self.sessions = 0
+        self.sentences_sent = 0
+        self.splits = 0
+        self.bad_checksums = 0
+        self.stalls = 0
+        self.disconnects = 0
+
+    def start(self):
+        """Starts listening in the background. With port=0 the chosen port is in self.port."""
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(2)
+        self.server.settimeout(0.2)  # So stop() does not hang in accept()
+        self.port = self.server.getsockname()[1]
+        self.running = True
+        self.accept_thread = threading.Thread(target=self.acceptLoop, daemon=True)
+        self.accept_thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.session:
+            self.session.close()
+        if self.accept_thread:
+            self.accept_thread.join()
+        if self.server:
+            self.server.close()
+            self.server = None
+
+    def acceptLoop(self):
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            conn.settimeout(None)
+            # Replies go out as soon as written, otherwise pipelined commands wait for delayed ACKs.
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.session and self.session.alive:
+                # The sensor only accepts one telnet session.
+                conn.close()
+                continue
+            self.sessions += 1
+            self.session = SimulatorSession(self, conn)
+            self.session.start()
+
+    def statusCode(self):
+        return 4 if time.monotonic() < self.settling_until else 0
+
+    def handleCommand(self, session, line):
+        """Returns the reply text for one command line."""
+        parts = line.split(maxsplit=1)
+        if not parts:
+            return ""
+        query = parts[0].upper()
+        data = parts[1].strip() if len(parts) > 1 else None
+
+        if query == "CO":
+            if data == "ON":
+                session.streaming = True
+            elif data == "OFF":
+                session.streaming = False
+            return f"CO {'ON' if session.streaming else 'OFF'}"
+        if query in ("SE", "COR", "IPA", "GW", "MASK", "SPT"):
+            if data is not None:
+                if query in ("SE", "COR") and not data.isdigit():
+                    return "ERR"
+                self.settings[query] = data
+            return f"{query} {self.settings[query]}"
+        if query == "WTY":
+            if data in ("FS", "SW"):
+                self.settings["WTY"] = data
+            elif data is not None:
+                return "ERR"
+            return f"WTY {self.settings['WTY']}"
+        if query == "STA":
+            return f"STA {self.statusCode()}"
+        if query == "SC":
+            return "SC OK"
+        if query == "RE":
+            self.settling_until = time.monotonic() + self.settle_seconds
+            return "RE"
+        if query == "PT":
+            return "\r\n".join(f"{key} {value}" for key, value in self.settings.items())
+        if query == "SN":
+            return "SN 000123"
+        if query == "PV":
+            return "PV 1.00 SIM"
+        if query == "WT":
+            return f"WT {int(time.monotonic() // 3600)}"
+        if query == "PE":
+            return "PE"
+        return "ERR"
+
+    def nextSentence(self, now):
+        """Builds one sentence: background noise plus optional metal passes."""
+        rh1 = 4000 + self.random.gauss(0, 15)
+        rl1 = 2000 + self.random.gauss(0, 10)
+        dtype, dis, dim = "N", 0, "N"
+        if self.target_interval:
+            phase = now % self.target_interval - self.target_interval / 2
+            bump = math.exp(-(phase / 0.3) ** 2)
+            if bump > 0.05:
+                rh1 += 800 * bump
+                rl1 += 400 * bump
+                dtype, dis, dim = "F", int(100 * (1 - bump)), "M"
+        rh1r, rl1r = 4000, 2000
+        if self.tag_samples:
+            rh1r = self.sentences_sent % 2**31
+            rl1r = time.monotonic_ns() // 1000 % 1_000_000_000
+        sentence = formatMDA3(int(rh1), rh1r, int(rl1), rl1r, dtype, dis, dim)
+
+        if self.random.random() < self.bad_checksum_probability:
+            self.bad_checksums += 1
+            star = sentence.rfind("*")
+            sentence = f"{sentence[:star]}*{(nmeaChecksum(sentence[1:star]) ^ 0x5A):02X}"
+        return sentence
+
+
+class SimulatorSession:
+
+    def __init__(self, simulator, conn):
+        self.simulator = simulator
+        self.conn = conn
+        self.alive = True
+        self.logged_in = False
+        self.streaming = False
+        self.write_lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def start(self):
+        threading.Thread(target=self.commandLoop, daemon=True).start()
+        threading.Thread(target=self.streamLoop, daemon=True).start()
+
+    def send(self, text):
+        with self.write_lock:
+            self.conn.sendall(text.encode())
+
+    def close(self):
+        if self.alive:
+            self.alive = False
+            try:
+                self.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.conn.close()
+
+    def commandLoop(self):
+        buffer = b""
+        try:
+            while self.alive:
+                data = self.conn.recv(1024)
+                if not data:
+                    break
+                buffer += data
+                while b"\r" in buffer:
+                    raw, buffer = buffer.split(b"\r", 1)
+                    line = raw.decode(errors="replace").strip()
+                    if not self.logged_in:
+                        if line == self.simulator.pin:
+                            self.logged_in = True
+                            self.send("\r\n>")
+                        else:
+                            self.send("ERR PIN\r\n>")
+                        continue
+                    self.send(f"{self.simulator.handleCommand(self, line)}\r\n>")
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def streamLoop(self):
+        simulator = self.simulator
+        next_time = time.monotonic()
+        try:
+            while self.alive:
+                now = time.monotonic()
+                if simulator.disconnect_after is not None and now - self.started > simulator.disconnect_after:
+                    simulator.disconnects += 1
+                    self.close()
+                    break
+                if not self.streaming:
+                    next_time = now
+                    time.sleep(0.005)
+                    continue
+
+                rate = max(1, int(simulator.settings["COR"]))
+                if now < next_time:
+                    time.sleep(min(next_time - now, 0.005))
+                    continue
+                if simulator.random.random() < simulator.stall_probability:
+                    simulator.stalls += 1
+                    time.sleep(simulator.stall_seconds)
+
+                # Send every sentence that is due, so high rates keep up despite sleep granularity.
+                while next_time <= time.monotonic() and self.alive:
+                    sentence = simulator.nextSentence(next_time) + "\r"
+                    if simulator.random.random() < simulator.split_probability:
+                        simulator.splits += 1
+                        cut = simulator.random.randint(1, len(sentence) - 1)
+                        with self.write_lock:
+                            # Two TCP segments, but nothing else gets in between like on the real link.
+                            self.conn.sendall(sentence[:cut].encode())
+                            time.sleep(0.001)
+                            self.conn.sendall(sentence[cut:].encode())
+                    else:
+                        self.send(sentence)
+                    simulator.sentences_sent += 1
+                    next_time += 1.0 / rate
+        except OSError:
+            self.close()
+
+
+if __name__ == "__main__":
+    simulator = CEIASensorSimulator(port=2323, target_interval=10).start()
+    print(f"CEIA simulator listening on {simulator.host}:{simulator.port}, PIN {simulator.pin}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
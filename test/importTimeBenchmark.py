@@ -0,0 +1,64 @@
+"""
+Cold import time of the driver modules, as the vehicle computer sees it on start-up.
+
+Every module is imported in a fresh interpreter, repeated --repeat times,
+and the median wall time is reported together with the slowest imports
+from python -X importtime. Fails if a headless module pulls in matplotlib.
+
+    python importTimeBenchmark.py --repeat 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+DRIVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "driver")
+HEADLESS_MODULES = ("ceiaSensorDriver", "multiSensorManager", "asyncCeiaSensorDriver", "headlessAcquisition")
+
+PROBE = (
+    "import sys, time; start = time.perf_counter(); import {module}; "
+    "print(time.perf_counter() - start, 'matplotlib' in sys.modules)"
+)
+
+
+def importOnce(module):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=DRIVER_DIR, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def slowestImports(module, count=5):
+    """Returns the count imports with the largest cumulative time in us, from -X importtime."""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=DRIVER_DIR, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[1:count + 1]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--modules", nargs="+", default=list(HEADLESS_MODULES))
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        runs = [importOnce(module) for _ in range(args.repeat)]
+        median_ms = statistics.median(seconds for seconds, _ in runs) * 1000
+        loads_matplotlib = any(loaded for _, loaded in runs)
+        print(f"{module:24s} {median_ms:7.1f} ms{'   ERROR: imports matplotlib' if loads_matplotlib else ''}")
+        for cumulative_us, name in slowestImports(module):
+            print(f"    {cumulative_us / 1000:7.1f} ms  {name}")
+        failed |= loads_matplotlib
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,81 @@
+"""
+Microbenchmark of the $MDA3 parser.
+
+Compares the old per line re.match + dict + 2x datetime.now() implementation
+with MDA3Parser (single sentence and batch entry point, for a typical chunk
+and a burst after a stall). Prints the cost per sample in microseconds.
+"""
+import os
+import re
+import sys
+import time
+import timeit
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "driver"))
+
+from mda3Parser import MDA3Parser, formatMDA3
+
+
+def legacyParse(data_line):
+    # Copy of the old CEIACWDDW_Driver.parseSensorData without the side effects.
+    pattern = r"\$MDA3,(\d+),(\d+),(\d+),(\d+),([NF]{1,2}),(\d+),([NSML])\*(\w+)"
+    match = re.match(pattern, data_line)
+
+    if not match:
+        return None
+
+    rh1, rh1r, rl1, rl1r, dtype, dis, dim, checksum = match.groups()
+
+    parsed_data = {
+        "Timestamp": datetime.now().isoformat(),
+        "RH1": int(rh1),
+        "RH1R": int(rh1r),
+        "RL1": int(rl1),
+        "RL1R": int(rl1r),
+        "TYPE": dtype,
+        "DIS": int(dis),
+        "DIM": dim,
+        "CHECKSUM": checksum
+    }
+    datetime.now()
+    return parsed_data
+
+
+def runBenchmark(n_sentences=10000, repeat=5, batch_sizes=(20, 100)):
+    sentences = [formatMDA3(4000 + i % 500, 3900, 2000 + i % 300, 1950, "NF", i % 100, "SML"[i % 3])
+                 for i in range(n_sentences)]
+    parser = MDA3Parser(validate_checksum=True)
+
+    def legacy():
+        for line in sentences:
+            legacyParse(line)
+
+    def single():
+        for line in sentences:
+            parser.parse(line, time.time_ns())
+
+    def batchRunner(batch_size):
+        batches = [sentences[i:i + batch_size] for i in range(0, n_sentences, batch_size)]
+
+        def batch():
+            for chunk in batches:
+                parser.parseBatch(chunk, time.time_ns(), 20_000_000)
+        return batch
+
+    runs = [("legacy regex + dict", legacy), ("MDA3Parser.parse", single)]
+    runs += [(f"MDA3Parser.parseBatch ({batch_size})", batchRunner(batch_size)) for batch_size in batch_sizes]
+    results = {}
+    for name, function in runs:
+        best = min(timeit.repeat(function, number=1, repeat=repeat))
+        results[name] = best / n_sentences * 1e6
+
+    baseline = results["legacy regex + dict"]
+    print(f"{n_sentences} sentences, best of {repeat}")
+    for name, us in results.items():
+        print(f"{name:32s} {us:7.3f} us/sample  x{baseline / us:4.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    runBenchmark()